@@ -1,24 +1,195 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, make_response, stream_with_context
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 from datetime import datetime, timedelta
 import sqlite3
 import os
+import hashlib
+import json
+
+import click
+
+import archive
+import assets
+import booking
+from booking import is_date, is_time
+from availability import RecurringAvailability, weekday_mask, weekday_names, WEEKDAYS
+import compress
+import db
+import export
+import fragments
+import importer
+import jobs
+import metrics
+import repository
+from cache import FragmentCache, TTLCache
+from directory import DoctorDirectory
+from pagination import Page, paginate, page_size
+from search import search_patients
+from slots import free_slots, next_free_slots
+from slowlog import SlowQueryLog
+from streaming import stream_format, stream_items, stream_query
 
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
-app.config['DATABASE'] = 'hospital.db'
+# The settings below are defaults: an HMS_<NAME> environment variable overrides any of them
+# (values are parsed as JSON when possible, e.g. HMS_DB_POOL_SIZE=16 or HMS_JOBS_ENABLED=false)
+app.config.from_prefixed_env('HMS')
+DEV_SECRET_KEY = 'your-secret-key-here-change-in-production'
+if not app.config['SECRET_KEY']:
+    app.config['SECRET_KEY'] = DEV_SECRET_KEY
+app.config.setdefault('DATABASE', 'hospital.db')
+
+# Connection pool tuning: the DB_* defaults live in db.DEFAULT_CONFIG
+db.init_app(app)
+
+# Logged-in user cache used by load_user
+app.config.setdefault('USER_CACHE_SIZE', 4096)
+app.config.setdefault('USER_CACHE_TTL', 300)
+user_cache = TTLCache()
+
+# In-memory departments/doctors directory; reloaded when manage_doctors bumps its version,
+# and at least every DIRECTORY_TTL seconds so other worker processes' writes show up
+app.config.setdefault('DIRECTORY_TTL', 60)
+directory = DoctorDirectory()
+
+# Keyset pagination for listing pages and APIs (?limit= is clamped to MAX_PAGE_SIZE)
+app.config.setdefault('PAGE_SIZE', 50)
+app.config.setdefault('MAX_PAGE_SIZE', 500)
+
+# Maximum number of ranked results returned by the admin patient search
+app.config.setdefault('PATIENT_SEARCH_LIMIT', 100)
+
+# Recurring availability rules are expanded per week on demand; expanded weeks are cached
+app.config.setdefault('AVAILABILITY_CACHE_SIZE', 4096)
+app.config.setdefault('AVAILABILITY_CACHE_TTL', 300)
+recurring = RecurringAvailability()
+
+# Appointment slot length used to expand availability windows, and the widest free-slot query
+app.config.setdefault('SLOT_MINUTES', 30)
+app.config.setdefault('FREE_SLOTS_MAX_DAYS', 62)
+# How far ahead the doctor search and /api/doctors look for each doctor's next free slot
+app.config.setdefault('NEXT_SLOT_DAYS', 14)
+# The next-slot map is cached under the versions of the tables that change it, so conditional
+# requests are answered without a query; the TTL bounds staleness from other worker processes
+# and from slots passing during the day
+app.config.setdefault('NEXT_SLOT_CACHE_TTL', 60)
+SLOT_TABLES = ('appointments', 'doctor_availability', 'availability_rules', 'availability_exceptions')
+next_slot_cache = TTLCache(maxsize=256)
+# Largest number of operations accepted by POST /api/appointments/batch
+app.config.setdefault('BATCH_MAX_OPERATIONS', 500)
+
+# Rows fetched per fetchmany() batch by streaming API responses (?stream=1)
+app.config.setdefault('STREAM_BATCH_SIZE', 500)
+# ... and by the appointment export (/admin/export, `flask export-appointments`)
+app.config.setdefault('EXPORT_BATCH_SIZE', 2000)
+
+# Text responses of GZIP_MIN_SIZE bytes or more are gzip-compressed, streamed ones chunk by chunk
+# (see compress.py); set GZIP_ENABLED to False when a reverse proxy already compresses
+app.config.setdefault('GZIP_ENABLED', True)
+app.config.setdefault('GZIP_MIN_SIZE', 1024)
+app.config.setdefault('GZIP_LEVEL', 6)
+compress.init_app(app)
+
+# Content-hashed, pre-compressed copies of static/ linked with asset_url() and cached as immutable
+# (see assets.py); create_app() rebuilds them when a source changes, `flask build-assets` on demand
+app.config.setdefault('ASSETS_AUTO_BUILD', True)
+static_assets = assets.Assets(app.static_folder)
+assets.init_app(app, static_assets)
+
+# Rendered fragments of the big listing templates ({% cache %} blocks), keyed on per-table
+# versions bumped by data_changed(); FRAGMENT_CACHE_TTL bounds staleness across worker processes
+app.config.setdefault('FRAGMENT_CACHE_BYTES', 16 * 1024 * 1024)
+app.config.setdefault('FRAGMENT_CACHE_TTL', 60)
+fragment_cache = FragmentCache()
+table_versions = fragments.TableVersions()
+fragments.init_app(app, fragment_cache, table_versions)
+
+# Per-request timing and SQL instrumentation, exposed at /admin/metrics
+metrics_registry = metrics.MetricsRegistry()
+metrics_registry.register_cache('users', user_cache)
+metrics_registry.register_cache('availability_weeks', recurring.weeks)
+metrics_registry.register_cache('fragments', fragment_cache)
+metrics_registry.register_cache('next_slots', next_slot_cache)
+metrics_registry.register_queries(repository.query_stats)
+metrics.init_app(app, metrics_registry)
+
+# Queries slower than SLOW_QUERY_MS are logged with their EXPLAIN QUERY PLAN to a rotating JSONL file
+app.config.setdefault('SLOW_QUERY_MS', 100)
+app.config.setdefault('SLOW_QUERY_LOG', 'slow_queries.jsonl')
+app.config.setdefault('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024)
+app.config.setdefault('SLOW_QUERY_LOG_BACKUPS', 3)
+slow_log = SlowQueryLog(app.config['SLOW_QUERY_LOG'])
+
+# Background housekeeping started with the first request (see jobs.py); intervals are in seconds.
+# Deployments that run the jobs from cron (`flask run-jobs`) can set JOBS_ENABLED to False.
+app.config.setdefault('JOBS_ENABLED', True)
+app.config.setdefault('JOBS_BATCH_SIZE', 500)
+app.config.setdefault('NO_SHOW_INTERVAL', 15 * 60)
+# Days a past appointment stays 'Booked' (and can still be completed) before it becomes a no-show
+app.config.setdefault('NO_SHOW_GRACE_DAYS', 1)
+app.config.setdefault('AVAILABILITY_EXPIRY_INTERVAL', 6 * 60 * 60)
+app.config.setdefault('AVAILABILITY_RETENTION_DAYS', 30)
+app.config.setdefault('REMINDER_INTERVAL', 5 * 60)
+app.config.setdefault('REMINDER_LEAD_HOURS', 24)
+scheduler = jobs.Scheduler(app, on_change=lambda *tables: data_changed(*tables))
+
+# Finished appointments older than ARCHIVE_AFTER_DAYS move to the attached archive database
+# (ARCHIVE_DATABASE, by default next to DATABASE); see archive.py
+app.config.setdefault('ARCHIVE_DATABASE', None)
+app.config.setdefault('ARCHIVE_AFTER_DAYS', 365)
+app.config.setdefault('ARCHIVE_INTERVAL', 24 * 60 * 60)
+jobs.init_app(app, scheduler)
+
+# Helper function to size the caches, the slow-query log and the jobs from the settings above;
+# runs at import and again in create_app(), so settings passed to the factory take effect too
+def configure():
+    config = app.config
+    user_cache.configure(config['USER_CACHE_SIZE'], config['USER_CACHE_TTL'])
+    directory.ttl = config['DIRECTORY_TTL']
+    recurring.weeks.configure(config['AVAILABILITY_CACHE_SIZE'], config['AVAILABILITY_CACHE_TTL'])
+    next_slot_cache.configure(next_slot_cache.maxsize, config['NEXT_SLOT_CACHE_TTL'])
+    fragment_cache.configure(config['FRAGMENT_CACHE_BYTES'], config['FRAGMENT_CACHE_TTL'])
+    slow_log.configure(config['SLOW_QUERY_LOG'], threshold_ms=config['SLOW_QUERY_MS'],
+                       max_bytes=config['SLOW_QUERY_LOG_MAX_BYTES'], backup_count=config['SLOW_QUERY_LOG_BACKUPS'])
+    # Re-adding a job replaces it with the new interval and arguments
+    scheduler.add('no_shows', jobs.mark_no_shows, config['NO_SHOW_INTERVAL'], tables=('appointments',),
+                  grace_days=config['NO_SHOW_GRACE_DAYS'], batch_size=config['JOBS_BATCH_SIZE'])
+    scheduler.add('expire_availability', jobs.expire_availability, config['AVAILABILITY_EXPIRY_INTERVAL'],
+                  tables=('doctor_availability',), retention_days=config['AVAILABILITY_RETENTION_DAYS'],
+                  batch_size=config['JOBS_BATCH_SIZE'])
+    scheduler.add('reminders', jobs.queue_reminders, config['REMINDER_INTERVAL'], tables=('reminder_outbox',),
+                  lead_hours=config['REMINDER_LEAD_HOURS'], batch_size=config['JOBS_BATCH_SIZE'])
+    scheduler.add('archive', archive.archive_appointments, config['ARCHIVE_INTERVAL'],
+                  tables=('appointments', 'treatments'), older_than_days=config['ARCHIVE_AFTER_DAYS'],
+                  batch_size=config['JOBS_BATCH_SIZE'])
+
+configure()
 
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# Database initialization
+# Database initialization; a cheap check once the schema is current, and serialized across
+# processes by a lock file so that workers starting together create and migrate it only once
 def init_db():
+    database = app.config['DATABASE']
+    archive_path = db.archive_database(app.config)
+    if db.is_current(database) and os.path.exists(archive_path):
+        return False
+    with db.FileLock(database + '.lock'):
+        if db.is_current(database) and os.path.exists(archive_path):
+            return False
+        create_schema()
+    return True
+
+def create_schema():
     conn = sqlite3.connect(app.config['DATABASE'])
+    # WAL mode is persistent; switching needs an exclusive lock, so do it once here rather than
+    # have the first pooled connections (e.g. a request and the job worker) race to convert it
+    conn.execute("PRAGMA journal_mode = WAL")
     c = conn.cursor()
-    print('conn cursor created')
+    app.logger.debug('Creating schema in %s', app.config['DATABASE'])
     
     # Users table (for authentication)
     c.execute('''CREATE TABLE IF NOT EXISTS users (
@@ -125,8 +296,12 @@ def init_db():
         c.execute("INSERT OR IGNORE INTO departments (name, description) VALUES (?, ?)", dept)
     
     conn.commit()
+    
+    # Upgrade existing databases in place (indexes and later schema changes)
+    version = db.migrate(conn)
+    app.logger.info('Schema at version %s', version)
+    archive.init_schema(conn, db.archive_database(app.config))
     conn.close()
-    print('cursor committed and closed ')
 
 # User class for Flask-Login
 class User(UserMixin):
@@ -137,15 +312,17 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
-    conn = sqlite3.connect(app.config['DATABASE'])
-    c = conn.cursor()
-    c.execute("SELECT id, username, role FROM users WHERE id = ?", (user_id,))
-    user_data = c.fetchone()
-    conn.close()
+    # Served from the in-process cache; only misses touch the database
+    user_data = user_cache.get(str(user_id))
+    if user_data is None:
+        conn = get_db()
+        row = conn.execute("SELECT id, username, role FROM users WHERE id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        user_data = (row[0], row[1], row[2])
+        user_cache.set(str(user_id), user_data)
     
-    if user_data:
-        return User(user_data[0], user_data[1], user_data[2])
-    return None
+    return User(*user_data)
 
 # Role-based access decorator
 def role_required(roles):
@@ -161,11 +338,72 @@ def role_required(roles):
         return decorated_function
     return decorator
 
-# Helper function to get database connection
+# Helper function to paginate a listing with the ?after= / ?before= cursors of the current request
+def paginate_request(conn, select, where, params, keys, descending=False):
+    limit = page_size(request.args, app.config['PAGE_SIZE'], app.config['MAX_PAGE_SIZE'])
+    return paginate(conn, select, where, params, keys, descending=descending,
+                    after=request.args.get('after'), before=request.args.get('before'),
+                    limit=limit)
+
+# Helper function to call after committing writes: expires cached fragments and the doctor directory
+def data_changed(*tables):
+    table_versions.bump(*tables)
+    if 'doctors' in tables or 'departments' in tables:
+        directory.invalidate()
+
+# Helper function to get the doctor directory snapshot, only touching the database when it is stale
+def directory_snapshot():
+    return directory.current() or directory.snapshot(get_db())
+
+# Helper function to answer conditional GETs (If-None-Match / If-Modified-Since) with a 304
+def not_modified(etag, last_modified=None):
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    else:
+        matched = (last_modified is not None and request.if_modified_since is not None
+                   and last_modified <= request.if_modified_since)
+    if not matched:
+        return None
+    return with_validators(Response(status=304), etag, last_modified)
+
+# Helper function to attach the validators to a response; clients must revalidate before reuse
+def with_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Helper function to get each doctor's next free slot (one batched query for all of them on a
+# cache miss); returns the slots by doctor id and a digest of them for ETags
+def next_slots(doctors):
+    today = datetime.now().date()
+    doctor_ids = tuple(doctor['id'] for doctor in doctors)
+    key = (table_versions.get(*SLOT_TABLES), str(today), doctor_ids)
+    entry = next_slot_cache.get(key)
+    if entry is None:
+        slots = next_free_slots(get_db(), list(doctor_ids), str(today),
+                                str(today + timedelta(days=app.config['NEXT_SLOT_DAYS'])),
+                                app.config['SLOT_MINUTES'], recurring=recurring)
+        digest = hashlib.sha1(json.dumps(sorted(slots.items(), key=lambda item: item[0])).encode()).hexdigest()[:12]
+        entry = (slots, digest)
+        next_slot_cache.set(key, entry)
+    return entry
+
+# Helper function to add the next free slots to the doctors, optionally ordering them by the soonest one
+def with_next_slots(doctors, slots, sort=None):
+    doctors = [dict(doctor, next_available=slots[doctor['id']]) for doctor in doctors]
+    if sort == 'soonest':
+        # Stable sort: doctors without a free slot go last and ties keep name order
+        def soonest(doctor):
+            slot = doctor['next_available']
+            return (0, slot['date'], slot['start']) if slot else (1, '', '')
+        doctors.sort(key=soonest)
+    return doctors
+
+# Helper function to get the request-scoped pooled database connection, instrumented for metrics
 def get_db():
-    conn = sqlite3.connect(app.config['DATABASE'])
-    conn.row_factory = sqlite3.Row
-    return conn
+    return metrics.instrument(db.get_db(), observers=[slow_log.observe])
 
 # Routes
 @app.route('/')
@@ -187,7 +425,6 @@ def login():
         conn = get_db()
         user_data = conn.execute("SELECT * FROM users WHERE username = ? AND role = ?", 
                                 (username, role)).fetchone()
-        conn.close()
         
         if user_data and (user_data['password']==password):
             user = User(user_data['id'], user_data['username'], user_data['role'])
@@ -218,7 +455,6 @@ def register():
         existing = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
         if existing:
             flash('Username already exists!', 'danger')
-            conn.close()
             return redirect(url_for('register'))
         
         # Create user
@@ -234,7 +470,7 @@ def register():
                     (user_id, name, age, gender, phone, email, address, blood_group))
         
         conn.commit()
-        conn.close()
+        data_changed('patients')
         
         flash('Registration successful! Please login.', 'success')
         return redirect(url_for('login'))
@@ -254,43 +490,27 @@ def dashboard():
     conn = get_db()
     
     if current_user.role == 'admin':
-        total_doctors = conn.execute("SELECT COUNT(*) as count FROM doctors WHERE is_active = 1").fetchone()['count']
-        total_patients = conn.execute("SELECT COUNT(*) as count FROM patients WHERE is_active = 1").fetchone()['count']
-        total_appointments = conn.execute("SELECT COUNT(*) as count FROM appointments").fetchone()['count']
-        
-        recent_appointments = conn.execute("""
-            SELECT a.*, p.name as patient_name, d.name as doctor_name, d.specialization
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.id
-            JOIN doctors d ON a.doctor_id = d.id
-            ORDER BY a.created_at DESC LIMIT 10
-        """).fetchall()
+        # Counters are kept up to date by triggers (see db.py migration 4)
+        stats = db.read_stats(conn)
+        total_doctors = stats['doctors_active']
+        total_patients = stats['patients_active']
+        total_appointments = sum(stats['appointments'].values())
         
-        conn.close()
+        recent_appointments = repository.recent_appointments(conn, limit=10)
         
         return render_template('admin_dashboard.html', 
                              total_doctors=total_doctors,
                              total_patients=total_patients,
                              total_appointments=total_appointments,
+                             appointment_status_counts=stats['appointments'],
                              recent_appointments=recent_appointments)
     
     elif current_user.role == 'doctor':
-        doctor = conn.execute("SELECT * FROM doctors WHERE user_id = ?", (current_user.id,)).fetchone()
+        doctor = repository.doctor_by_user(conn, current_user.id)
         
         today = datetime.now().strftime('%Y-%m-%d')
-        upcoming_appointments = conn.execute("""
-            SELECT a.*, p.name as patient_name, p.phone, p.age, p.gender
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.id
-            WHERE a.doctor_id = ? AND a.date >= ? AND a.status = 'Booked'
-            ORDER BY a.date, a.time
-        """, (doctor['id'], today)).fetchall()
-        
-        total_patients = conn.execute("""
-            SELECT COUNT(DISTINCT patient_id) as count FROM appointments WHERE doctor_id = ?
-        """, (doctor['id'],)).fetchone()['count']
-        
-        conn.close()
+        upcoming_appointments = repository.doctor_upcoming(conn, doctor.id, today)
+        total_patients = repository.doctor_patient_count(conn, doctor.id)
         
         return render_template('doctor_dashboard.html',
                              doctor=doctor,
@@ -298,29 +518,14 @@ def dashboard():
                              total_patients=total_patients)
     
     elif current_user.role == 'patient':
-        patient = conn.execute("SELECT * FROM patients WHERE user_id = ?", (current_user.id,)).fetchone()
+        patient = repository.patient_by_user(conn, current_user.id)
         
-        departments = conn.execute("SELECT * FROM departments ORDER BY name").fetchall()
+        departments = directory.departments(conn)
         
         today = datetime.now().strftime('%Y-%m-%d')
-        upcoming_appointments = conn.execute("""
-            SELECT a.*, d.name as doctor_name, d.specialization
-            FROM appointments a
-            JOIN doctors d ON a.doctor_id = d.id
-            WHERE a.patient_id = ? AND a.date >= ?
-            ORDER BY a.date, a.time
-        """, (patient['id'], today)).fetchall()
-        
-        past_appointments = conn.execute("""
-            SELECT a.*, d.name as doctor_name, d.specialization, t.diagnosis, t.prescription
-            FROM appointments a
-            JOIN doctors d ON a.doctor_id = d.id
-            LEFT JOIN treatments t ON a.id = t.appointment_id
-            WHERE a.patient_id = ? AND (a.date < ? OR a.status = 'Completed')
-            ORDER BY a.date DESC, a.time DESC
-        """, (patient['id'], today)).fetchall()
-        
-        conn.close()
+        upcoming_appointments = repository.patient_upcoming(conn, patient.id, today)
+        # Full history: live appointments plus the archived ones
+        past_appointments = repository.patient_past(conn, patient.id, today)
         
         return render_template('patient_dashboard.html',
                              patient=patient,
@@ -328,7 +533,6 @@ def dashboard():
                              upcoming_appointments=upcoming_appointments,
                              past_appointments=past_appointments)
     
-    conn.close()
     return redirect(url_for('login'))
 
 # Admin routes
@@ -368,31 +572,23 @@ def manage_doctors():
                               VALUES (?, ?, ?, ?, ?, ?, ?)""",
                            (user_id, name, specialization, department_id, phone, email, experience))
                 
-                conn.execute("UPDATE departments SET doctors_count = doctors_count + 1 WHERE id = ?", (department_id,))
                 conn.commit()
+                data_changed('doctors', 'departments')
                 flash('Doctor added successfully!', 'success')
         
         elif action == 'delete':
             doctor_id = request.form.get('doctor_id')
-            doctor = conn.execute("SELECT * FROM doctors WHERE id = ?", (doctor_id,)).fetchone()
+            doctor = repository.doctor_by_id(conn, doctor_id)
             conn.execute("UPDATE doctors SET is_active = 0 WHERE id = ?", (doctor_id,))
-            conn.execute("UPDATE departments SET doctors_count = doctors_count - 1 WHERE id = ?", (doctor['department_id'],))
             conn.execute('DELETE from doctors where id=?',(doctor_id))
-            conn.execute('DELETE from users where id=?',(doctor['user_id'],))
+            conn.execute('DELETE from users where id=?',(doctor.user_id,))
             conn.commit()
+            user_cache.invalidate(str(doctor.user_id))
+            data_changed('doctors', 'departments')
             flash('Doctor removed successfully!', 'success')
     
-    doctors = conn.execute("""
-        SELECT d.*, dep.name as department_name
-        FROM doctors d
-        LEFT JOIN departments dep ON d.department_id = dep.id
-        WHERE d.is_active = 1
-        ORDER BY d.name
-    """).fetchall()
-    
-    departments = conn.execute("SELECT * FROM departments ORDER BY name").fetchall()
-    
-    conn.close()
+    doctors = directory.doctors(conn)
+    departments = directory.departments(conn)
     
     return render_template('admin_doctors.html', doctors=doctors, departments=departments)
 
@@ -402,19 +598,15 @@ def manage_doctors():
 def manage_patients():
     conn = get_db()
     
-    search = request.args.get('search', '')
+    search = request.args.get('search', '').strip()
     if search:
-        patients = conn.execute("""
-            SELECT * FROM patients 
-            WHERE is_active = 1 AND (name LIKE ? OR phone LIKE ? OR email LIKE ?)
-            ORDER BY name
-        """, (f'%{search}%', f'%{search}%', f'%{search}%')).fetchall()
+        # Ranked full-text search returns the best matches rather than a paged listing
+        page = Page(search_patients(conn, search, app.config['PATIENT_SEARCH_LIMIT']))
     else:
-        patients = conn.execute("SELECT * FROM patients WHERE is_active = 1 ORDER BY name").fetchall()
-    
-    conn.close()
+        page = paginate_request(conn, repository.PATIENT_LISTING, ["p.is_active = 1"], [],
+                                keys=[('p.name', 'name'), ('p.id', 'id')])
     
-    return render_template('admin_patients.html', patients=patients, search=search)
+    return render_template('admin_patients.html', patients=page.rows, page=page, search=search)
 
 @app.route('/admin/appointments')
 @login_required
@@ -422,17 +614,47 @@ def manage_patients():
 def manage_appointments():
     conn = get_db()
     
-    appointments = conn.execute("""
-        SELECT a.*, p.name as patient_name, d.name as doctor_name, d.specialization
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.id
-        JOIN doctors d ON a.doctor_id = d.id
-        ORDER BY a.date DESC, a.time DESC
-    """).fetchall()
+    page = paginate_request(conn, repository.APPOINTMENT_LISTING, [], [],
+                            keys=[('a.date', 'date'), ('a.time', 'time'), ('a.id', 'id')], descending=True)
     
-    conn.close()
+    return render_template('admin_appointments.html', appointments=page.rows, page=page,
+                           export_formats=export.formats(), today=datetime.now().date(),
+                           month_ago=datetime.now().date() - timedelta(days=30))
+
+@app.route('/admin/export')
+@login_required
+@role_required(['admin'])
+def export_appointments():
+    # Appointments with patient, doctor, department and treatment for ?from=&to= (default: the last 30 days)
+    today = datetime.now().date()
+    fmt = request.args.get('format', 'csv')
+    try:
+        date_from = datetime.strptime(request.args.get('from') or str(today - timedelta(days=30)), '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.args.get('to') or str(today), '%Y-%m-%d').date()
+    except ValueError:
+        flash('Export dates must be in YYYY-MM-DD format!', 'danger')
+        return redirect(url_for('manage_appointments'))
+    if fmt not in export.formats():
+        flash(f'{fmt} export is not available; Parquet requires pyarrow', 'danger')
+        return redirect(url_for('manage_appointments'))
     
-    return render_template('admin_appointments.html', appointments=appointments)
+    generator = export.generate(db.get_pool(), fmt, str(date_from), str(date_to), app.config['EXPORT_BATCH_SIZE'])
+    response = Response(stream_with_context(generator), mimetype=export.MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=appointments_{date_from}_{date_to}.{fmt}'
+    return response
+
+@app.route('/admin/metrics')
+@login_required
+@role_required(['admin'])
+def admin_metrics():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/slow-queries')
+@login_required
+@role_required(['admin'])
+def admin_slow_queries():
+    entries = slow_log.read(limit=200)
+    return render_template('admin_slow_queries.html', entries=entries, threshold_ms=slow_log.threshold_ms)
 
 # Doctor routes
 @app.route('/doctor/appointments')
@@ -441,19 +663,12 @@ def manage_appointments():
 def doctor_appointments():
     conn = get_db()
     
-    doctor = conn.execute("SELECT * FROM doctors WHERE user_id = ?", (current_user.id,)).fetchone()
+    doctor = repository.doctor_by_user(conn, current_user.id)
     
-    appointments = conn.execute("""
-        SELECT a.*, p.name as patient_name, p.phone, p.age, p.gender, p.blood_group
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.id
-        WHERE a.doctor_id = ?
-        ORDER BY a.date DESC, a.time DESC
-    """, (doctor['id'],)).fetchall()
+    page = paginate_request(conn, repository.DOCTOR_SCHEDULE_LISTING, ["a.doctor_id = ?"], [doctor.id],
+                            keys=[('a.date', 'date'), ('a.time', 'time'), ('a.id', 'id')], descending=True)
     
-    conn.close()
-    
-    return render_template('doctor_appointments.html', appointments=appointments)
+    return render_template('doctor_appointments.html', appointments=page.rows, page=page)
 
 @app.route('/doctor/complete/<int:appointment_id>', methods=['GET', 'POST'])
 @login_required
@@ -471,27 +686,13 @@ def complete_appointment(appointment_id):
                        VALUES (?, ?, ?, ?)""",
                     (appointment_id, diagnosis, prescription, notes))
         conn.commit()
-        conn.close()
+        data_changed('appointments', 'treatments')
         
         flash('Appointment completed successfully!', 'success')
         return redirect(url_for('doctor_appointments'))
     
-    appointment = conn.execute("""
-        SELECT a.*, p.name as patient_name, p.age, p.gender, p.blood_group, p.phone
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.id
-        WHERE a.id = ?
-    """, (appointment_id,)).fetchone()
-    
-    patient_history = conn.execute("""
-        SELECT a.date, a.time, t.diagnosis, t.prescription, t.notes
-        FROM appointments a
-        LEFT JOIN treatments t ON a.id = t.appointment_id
-        WHERE a.patient_id = ? AND a.status = 'Completed'
-        ORDER BY a.date DESC
-    """, (appointment['patient_id'],)).fetchall()
-    
-    conn.close()
+    appointment = repository.appointment_with_patient(conn, appointment_id)
+    patient_history = repository.patient_history(conn, appointment.patient_id)
     
     return render_template('complete_appointment.html', appointment=appointment, patient_history=patient_history)
 
@@ -501,72 +702,125 @@ def complete_appointment(appointment_id):
 def doctor_availability():
     today = datetime.today().strftime('%Y-%m-%d')
     conn = get_db()
-    doctor = conn.execute("SELECT * FROM doctors WHERE user_id = ?", (current_user.id,)).fetchone()
+    doctor = repository.doctor_by_user(conn, current_user.id)
     
     if request.method == 'POST':
-        date = request.form.get('date')
+        action = request.form.get('action', 'add')
         start_time = request.form.get('start_time')
         end_time = request.form.get('end_time')
         
-        conn.execute("""INSERT INTO doctor_availability (doctor_id, date, start_time, end_time)
-                       VALUES (?, ?, ?, ?)""",
-                    (doctor['id'], date, start_time, end_time))
-        conn.commit()
-        flash('Availability added successfully!', 'success')
+        if action in ('add', 'add_rule') and not (is_time(start_time) and is_time(end_time) and start_time < end_time):
+            flash('Start time must be before end time!', 'danger')
+        
+        elif action == 'add':
+            date = request.form.get('date')
+            conn.execute("""INSERT INTO doctor_availability (doctor_id, date, start_time, end_time)
+                           VALUES (?, ?, ?, ?)""",
+                        (doctor.id, date, start_time, end_time))
+            conn.commit()
+            data_changed('doctor_availability')
+            flash('Availability added successfully!', 'success')
+        
+        elif action == 'add_rule':
+            valid_from = request.form.get('valid_from') or today
+            valid_until = request.form.get('valid_until') or None
+            try:
+                weekdays = weekday_mask(request.form.getlist('weekdays'))
+                valid = is_date(valid_from) and (valid_until is None or is_date(valid_until))
+            except ValueError:
+                weekdays, valid = 0, False
+            if not valid:
+                flash('Invalid weekdays or dates!', 'danger')
+            elif not weekdays:
+                flash('Select at least one weekday!', 'danger')
+            elif valid_until is not None and valid_until < valid_from:
+                flash('The end date must not be before the start date!', 'danger')
+            else:
+                conn.execute("""INSERT INTO availability_rules (doctor_id, weekdays, start_time, end_time, valid_from, valid_until)
+                               VALUES (?, ?, ?, ?, ?, ?)""",
+                            (doctor.id, weekdays, start_time, end_time, valid_from, valid_until))
+                conn.commit()
+                recurring.invalidate(doctor.id)
+                data_changed('availability_rules')
+                flash('Recurring availability added successfully!', 'success')
+        
+        elif action == 'delete_rule':
+            conn.execute("DELETE FROM availability_rules WHERE id = ? AND doctor_id = ?",
+                        (request.form.get('rule_id'), doctor.id))
+            conn.commit()
+            recurring.invalidate(doctor.id)
+            data_changed('availability_rules')
+            flash('Recurring availability removed!', 'success')
+        
+        elif action == 'add_exception':
+            day_off = request.form.get('date')
+            if not is_date(day_off):
+                flash('Please choose a valid date!', 'danger')
+            else:
+                conn.execute("""INSERT OR REPLACE INTO availability_exceptions (doctor_id, date, reason)
+                               VALUES (?, ?, ?)""",
+                            (doctor.id, day_off, request.form.get('reason')))
+                conn.commit()
+                recurring.invalidate(doctor.id)
+                data_changed('availability_exceptions')
+                flash('Day off added successfully!', 'success')
+        
+        elif action == 'delete_exception':
+            conn.execute("DELETE FROM availability_exceptions WHERE id = ? AND doctor_id = ?",
+                        (request.form.get('exception_id'), doctor.id))
+            conn.commit()
+            recurring.invalidate(doctor.id)
+            data_changed('availability_exceptions')
+            flash('Day off removed!', 'success')
     
     today = datetime.now().date()
     next_week = today + timedelta(days=7)
     
-    availabilities = conn.execute("""
-        SELECT * FROM doctor_availability 
-        WHERE doctor_id = ? AND date >= ? AND date <= ?
-        ORDER BY date, start_time
-    """, (doctor['id'], str(today), str(next_week))).fetchall()
+    availabilities = repository.availability_between(conn, doctor.id, str(today), str(next_week))
+    # Recurring rules are expanded for the displayed week rather than stored as rows
+    availabilities += [repository.Availability(doctor_id=doctor.id, date=date, start_time=start, end_time=end,
+                                               is_available=1, recurring=True)
+                       for date, start, end in recurring.windows(conn, doctor.id, today, next_week)]
+    availabilities.sort(key=lambda avail: (avail.date, avail.start_time))
     
-    conn.close()
+    rules = [dict(row, days=weekday_names(row['weekdays']))
+             for row in repository.current_rules(conn, doctor.id, str(today))]
+    exceptions = repository.upcoming_exceptions(conn, doctor.id, str(today))
     
-    return render_template('doctor_availability.html', availabilities=availabilities, today=today)
+    return render_template('doctor_availability.html', availabilities=availabilities, today=today,
+                           rules=rules, exceptions=exceptions, weekdays=WEEKDAYS)
 
 # Patient routes
 @app.route('/patient/search-doctors')
 @login_required
 @role_required(['patient'])
 def search_doctors():
-    db = get_db()  # ← this is the connection with row_factory set
-
     specialization = request.args.get('specialization', '').strip()
     name = request.args.get('name', '').strip()
+    sort = request.args.get('sort', 'name')
 
-    sql = """
-        SELECT d.*, dep.name AS department_name
-        FROM doctors d
-        LEFT JOIN departments dep ON d.department_id = dep.id
-        WHERE d.is_active = 1
-    """
-    conditions = []
-    params = []
-
-    if specialization:
-        conditions.append("dep.name LIKE ?")
-        params.append(f"%{specialization}%")
-    if name:
-        conditions.append("d.name LIKE ?")
-        params.append(f"%{name}%")
-
-    if conditions:
-        sql += " AND " + " AND ".join(conditions)
+    # Served from the in-memory directory's word-prefix indexes and the cached next-slot map
+    snapshot = directory_snapshot()
+    doctors = directory.search(get_db(), name=name, specialization=specialization)
+    slots, slots_digest = next_slots(doctors)
 
-    sql += " ORDER BY d.name"
+    # The page also depends on the user (navbar), query and free slots; pending flash messages must be shown.
+    # Free slots change without a directory update, so there is no Last-Modified
+    page_key = f'{current_user.id}|{request.query_string.decode()}|{slots_digest}'.encode()
+    etag = f'{snapshot.etag}-{hashlib.sha1(page_key).hexdigest()[:12]}'
+    if '_flashes' not in session:
+        response = not_modified(etag)
+        if response:
+            return response
 
-    # Critical: use db.execute(), not cursor.execute()
-    doctors = db.execute(sql, params).fetchall()
-    departments = db.execute("SELECT * FROM departments ORDER BY name").fetchall()
-
-    return render_template('search_doctors.html',
-                           doctors=doctors,
-                           departments=departments,
-                           specialization=specialization,
-                           name=name)
+    return with_validators(make_response(render_template('search_doctors.html',
+                                                         doctors=with_next_slots(doctors, slots, sort),
+                                                         departments=snapshot.departments,
+                                                         specialization=specialization,
+                                                         name=name,
+                                                         sort=sort,
+                                                         slots_digest=slots_digest)),
+                           etag)
 
 @app.route('/patient/book-appointment/<int:doctor_id>', methods=['GET', 'POST'])
 @login_required
@@ -579,41 +833,30 @@ def book_appointment(doctor_id):
         time = request.form.get('time')
         reason = request.form.get('reason')
         
-        patient = conn.execute("SELECT * FROM patients WHERE user_id = ?", (current_user.id,)).fetchone()
-        
-        # Check if slot is available
-        existing = conn.execute("""
-            SELECT * FROM appointments 
-            WHERE doctor_id = ? AND date = ? AND time = ? AND status != 'Cancelled'
-        """, (doctor_id, date, time)).fetchone()
+        patient = repository.patient_by_user(conn, current_user.id)
         
-        if existing:
-            flash('This time slot is already booked!', 'danger')
+        # Availability check and insert happen atomically; the unique slot index rejects double bookings
+        try:
+            booking.book(conn, patient.id, doctor_id, date, time, reason,
+                         slot_minutes=app.config['SLOT_MINUTES'])
+        except booking.BookingError as e:
+            flash(str(e), 'danger')
         else:
-            conn.execute("""INSERT INTO appointments (patient_id, doctor_id, date, time, reason)
-                           VALUES (?, ?, ?, ?, ?)""",
-                        (patient['id'], doctor_id, date, time, reason))
-            conn.commit()
+            data_changed('appointments')
             flash('Appointment booked successfully!', 'success')
-            conn.close()
             return redirect(url_for('dashboard'))
     
-    doctor = conn.execute("SELECT * FROM doctors WHERE id = ?", (doctor_id,)).fetchone()
-    print(doctor['department_id'])
-    dept=conn.execute('SELECT name FROM departments WHERE id=?',(doctor['department_id'],)).fetchone()
-    d=dept[0]
+    doctor = repository.doctor_by_id(conn, doctor_id)
+    dept = directory.department(conn, doctor.department_id)
+    d = dept['name'] if dept else None
     today = datetime.now().date()
     next_week = today + timedelta(days=7)
     
-    availabilities = conn.execute("""
-        SELECT * FROM doctor_availability 
-        WHERE doctor_id = ? AND date >= ? AND date <= ? AND is_available = 1
-        ORDER BY date, start_time
-    """, (doctor_id, str(today), str(next_week))).fetchall()
-    
-    conn.close()
+    # Only offer slots that are still free
+    slots = free_slots(conn, doctor_id, str(today), str(next_week), app.config['SLOT_MINUTES'],
+                       recurring=recurring)
     
-    return render_template('book_appointment.html', doctor=doctor, depart=d ,availabilities=availabilities)
+    return render_template('book_appointment.html', doctor=doctor, depart=d, slots=slots)
 
 @app.route('/patient/cancel-appointment/<int:appointment_id>')
 @login_required
@@ -623,7 +866,7 @@ def cancel_appointment(appointment_id):
     
     conn.execute("UPDATE appointments SET status = 'Cancelled' WHERE id = ?", (appointment_id,))
     conn.commit()
-    conn.close()
+    data_changed('appointments')
     
     flash('Appointment cancelled successfully!', 'success')
     return redirect(url_for('dashboard'))
@@ -648,10 +891,10 @@ def patient_profile():
                        WHERE user_id = ?""",
                     (name, age, gender, phone, email, address, blood_group, current_user.id))
         conn.commit()
+        data_changed('patients')
         flash('Profile updated successfully!', 'success')
     
-    patient = conn.execute("SELECT * FROM patients WHERE user_id = ?", (current_user.id,)).fetchone()
-    conn.close()
+    patient = repository.patient_by_user(conn, current_user.id)
     
     return render_template('patient_profile.html', patient=patient)
 
@@ -659,30 +902,184 @@ def patient_profile():
 @app.route('/api/doctors', methods=['GET'])
 @login_required
 def api_doctors():
-    conn = get_db()
-    doctors = conn.execute("SELECT * FROM doctors WHERE is_active = 1").fetchall()
-    conn.close()
+    fmt = stream_format(request)
+    sort = request.args.get('sort', 'name')
+    snapshot = directory_snapshot()
+    slots, slots_digest = next_slots(snapshot.doctors)
+    etag = f'doctors-{fmt or "json"}-{sort}-{snapshot.etag}-{slots_digest}'
+    response = not_modified(etag)
+    if response:
+        return response
+    
+    doctors = with_next_slots(snapshot.doctors, slots, sort)
+    if fmt:
+        response = stream_items(doctors, fmt)
+    else:
+        response = jsonify(doctors)
+    return with_validators(response, etag)
+
+@app.route('/api/departments', methods=['GET'])
+@login_required
+def api_departments():
+    snapshot = directory_snapshot()
+    etag = f'departments-{snapshot.etag}'
+    response = not_modified(etag, snapshot.modified_at)
+    if response:
+        return response
     
-    return jsonify([dict(doctor) for doctor in doctors])
+    return with_validators(jsonify(snapshot.departments), etag, snapshot.modified_at)
+
+@app.route('/api/doctors/<int:doctor_id>/free-slots', methods=['GET'])
+@login_required
+def api_doctor_free_slots(doctor_id):
+    today = datetime.now().date()
+    try:
+        date_from = datetime.strptime(request.args.get('from', str(today)), '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.args.get('to', str(date_from + timedelta(days=7))), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates in YYYY-MM-DD format'}), 400
+    if date_to < date_from or (date_to - date_from).days > app.config['FREE_SLOTS_MAX_DAYS']:
+        return jsonify({'error': f"date range must span 0 to {app.config['FREE_SLOTS_MAX_DAYS']} days"}), 400
+    
+    slots = free_slots(get_db(), doctor_id, str(date_from), str(date_to), app.config['SLOT_MINUTES'],
+                       recurring=recurring)
+    
+    return jsonify({'doctor_id': doctor_id,
+                    'from': str(date_from),
+                    'to': str(date_to),
+                    'slot_minutes': app.config['SLOT_MINUTES'],
+                    'slots': slots})
 
 @app.route('/api/appointments/<int:doctor_id>', methods=['GET'])
 @login_required
 def api_doctor_appointments(doctor_id):
+    # Streaming mode returns the doctor's full history without pagination
+    fmt = stream_format(request)
+    if fmt:
+        return stream_query(repository.APPOINTMENT_PATIENT_LISTING + """
+            WHERE a.doctor_id = ?
+            ORDER BY a.date, a.time, a.id
+        """, (doctor_id,), fmt, app.config['STREAM_BATCH_SIZE'])
+    
     conn = get_db()
-    appointments = conn.execute("""
-        SELECT a.*, p.name as patient_name
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.id
-        WHERE a.doctor_id = ?
-        ORDER BY a.date, a.time
-    """, (doctor_id,)).fetchall()
-    conn.close()
+    page = paginate_request(conn, repository.APPOINTMENT_PATIENT_LISTING, ["a.doctor_id = ?"], [doctor_id],
+                            keys=[('a.date', 'date'), ('a.time', 'time'), ('a.id', 'id')])
     
-    return jsonify([dict(apt) for apt in appointments])
+    return jsonify(page.to_dict('appointments'))
 
-if __name__ == '__main__':
-    if not os.path.exists(app.config['DATABASE']):
-        init_db()
-        print("Database initialized successfully!")
+@app.route('/api/appointments/batch', methods=['POST'])
+@login_required
+def api_appointments_batch():
+    # Body: a list of operations, or {"operations": [...], "atomic": true} to apply all or none, e.g.
+    # {"op": "book", "doctor_id": 1, "date": "2025-01-31", "time": "09:00", "reason": "...", "patient_id": 2},
+    # {"op": "cancel", "appointment_id": 7}, {"op": "complete", "appointment_id": 8, "diagnosis": "..."}
+    payload = request.get_json(silent=True)
+    operations = payload.get('operations') if isinstance(payload, dict) else payload
+    atomic = isinstance(payload, dict) and bool(payload.get('atomic'))
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'expected a non-empty JSON list of operations'}), 400
+    if len(operations) > app.config['BATCH_MAX_OPERATIONS']:
+        return jsonify({'error': f"at most {app.config['BATCH_MAX_OPERATIONS']} operations per batch"}), 413
+    
+    conn = get_db()
+    patient_id = doctor_id = None
+    if current_user.role == 'patient':
+        patient_id = repository.patient_by_user(conn, current_user.id).id
+    elif current_user.role == 'doctor':
+        doctor_id = repository.doctor_by_user(conn, current_user.id).id
+    results, applied = booking.apply_batch(conn, operations, current_user.role, patient_id, doctor_id,
+                                           atomic=atomic, slot_minutes=app.config['SLOT_MINUTES'])
+    if applied:
+        data_changed('appointments', 'treatments')
+    
+    failed = sum(1 for result in results if not result['ok'])
+    return jsonify({'applied': applied, 'failed': failed, 'results': results}), 409 if atomic and failed else 200
+
+# CLI commands
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(importer.IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per executemany() batch.')
+@click.option('--strict', is_flag=True, help='Abort without writing anything on the first invalid row.')
+def import_data(kind, path, fmt, batch_size, strict):
+    """Bulk import doctors, patients or availability from a CSV/JSONL file."""
     init_db()
-    app.run(debug=True)
\ No newline at end of file
+    try:
+        report = importer.import_file(get_db(), kind, path, fmt=fmt, batch_size=batch_size, strict=strict)
+    except importer.RowError as e:
+        raise click.ClickException(f'import aborted, nothing written: {e}')
+    data_changed('doctor_availability' if kind == 'availability' else kind)
+    
+    for where, reason in report['errors'][:20]:
+        click.echo(f'  skipped {where}: {reason}', err=True)
+    if len(report['errors']) > 20:
+        click.echo(f"  ... and {len(report['errors']) - 20} more", err=True)
+    click.echo(f"Imported {report['imported']} {kind} ({report['skipped']} skipped) "
+               f"in {report['seconds']:.2f}s, {report['rows_per_second']:.0f} rows/s")
+
+@app.cli.command('run-jobs')
+@click.argument('names', nargs=-1)
+def run_jobs(names):
+    """Run the background jobs once (all of them, or the given NAMES)."""
+    init_db()
+    for name in names or scheduler.jobs:
+        if name not in scheduler.jobs:
+            raise click.ClickException(f"unknown job {name}; choose from {', '.join(scheduler.jobs)}")
+        scheduler.run(name)
+        job = scheduler.stats()[name]
+        click.echo(f"{name}: {job['last_result']} rows in {job['last_seconds']:.2f}s"
+                   + (' (failed, see log)' if job['last_result'] is None else ''))
+
+@app.cli.command('export-appointments')
+@click.option('--from', 'date_from', required=True, type=click.DateTime(['%Y-%m-%d']), help='First date, YYYY-MM-DD.')
+@click.option('--to', 'date_to', required=True, type=click.DateTime(['%Y-%m-%d']), help='Last date, YYYY-MM-DD.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'parquet']), default='csv', show_default=True)
+@click.option('--output', '-o', default='-', type=click.Path(dir_okay=False, allow_dash=True),
+              help='Output file; CSV defaults to stdout.')
+def export_appointments_command(date_from, date_to, fmt, output):
+    """Export appointments with patient, doctor, department and treatment details for a date range."""
+    if fmt not in export.formats():
+        raise click.ClickException('Parquet export requires pyarrow (pip install pyarrow)')
+    if fmt == 'parquet' and output == '-':
+        raise click.ClickException('Parquet export needs --output')
+    init_db()
+    started = datetime.now()
+    with db.connection(db.get_pool(app)) as conn, click.open_file(output, 'wb') as f:
+        for chunk in export.export(conn, fmt, str(date_from.date()), str(date_to.date()),
+                                   app.config['EXPORT_BATCH_SIZE']):
+            f.write(chunk.encode() if isinstance(chunk, str) else chunk)
+    if output != '-':
+        click.echo(f'Exported to {output} in {(datetime.now() - started).total_seconds():.2f}s', err=True)
+
+@app.cli.command('build-assets')
+def build_assets():
+    """Write the fingerprinted and pre-compressed copies of the static files."""
+    for name, hashed in static_assets.build().items():
+        click.echo(f'{name} -> {assets.BUILD_DIR}/{hashed}')
+
+# Application factory for WSGI servers, e.g. gunicorn -w 4 'app:create_app()'
+def create_app(config=None):
+    """
+    Apply config on top of the defaults and HMS_* environment settings, resize the
+    caches, slow-query log and jobs to match, make sure the schema is current and
+    return the app. Nothing process-bound is created here: connection pools and the
+    job worker start lazily in each worker process, so the app is safe to fork.
+    """
+    if config:
+        app.config.update(config)
+        configure()
+    if app.config['SECRET_KEY'] == DEV_SECRET_KEY and not (app.debug or app.testing):
+        app.logger.warning('Using the built-in development SECRET_KEY; set HMS_SECRET_KEY')
+    if init_db():
+        app.logger.info('Database %s initialized', app.config['DATABASE'])
+    if app.config['ASSETS_AUTO_BUILD'] and static_assets.stale():
+        try:
+            static_assets.build()
+        except OSError as e:
+            # e.g. a read-only deployment; pages then link the plain static files
+            app.logger.warning('Could not build static assets: %s', e)
+    return app
+
+if __name__ == '__main__':
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Hot/cold archival of appointment history.
+Finished appointments (and their treatments) older than a configurable age are
+moved from the live tables into the same tables of an archive database that
+every pooled connection ATTACHes as `archive`, keeping the live tables small.
+Full-history reads combine both with union_archive().
+"""
+
+from datetime import datetime, timedelta
+
+# Archive tables mirror the live ones; ids are kept, so archived rows never collide
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS archive.appointments (
+        id INTEGER PRIMARY KEY,
+        patient_id INTEGER,
+        doctor_id INTEGER,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        status TEXT,
+        reason TEXT,
+        created_at TIMESTAMP
+    )""",
+    "CREATE INDEX IF NOT EXISTS archive.idx_appointments_patient_date ON appointments (patient_id, date)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_appointments_doctor_date ON appointments (doctor_id, date, time)",
+    # Date-range reads across all doctors (exports, reports)
+    "CREATE INDEX IF NOT EXISTS archive.idx_appointments_date ON appointments (date, time)",
+    """CREATE TABLE IF NOT EXISTS archive.treatments (
+        id INTEGER PRIMARY KEY,
+        appointment_id INTEGER,
+        diagnosis TEXT,
+        prescription TEXT,
+        notes TEXT,
+        created_at TIMESTAMP
+    )""",
+    "CREATE INDEX IF NOT EXISTS archive.idx_treatments_appointment ON treatments (appointment_id)",
+]
+
+# Statuses that can no longer change, so the rows are safe to move out of the live table
+FINISHED_STATUSES = ('Completed', 'Cancelled', 'No-Show')
+
+
+def attached(conn, alias='archive'):
+    return any(row[1] == alias for row in conn.execute("PRAGMA database_list"))
+
+
+def init_schema(conn, path):
+    """Attach the archive database at path (if needed) and create its tables"""
+    if not attached(conn):
+        conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    conn.execute("PRAGMA archive.journal_mode = WAL")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+
+
+# Archived appointments that are not (any longer, or yet) also in the live table
+ARCHIVE_ONLY = """(SELECT id, patient_id, doctor_id, date, time, status, reason, created_at
+    FROM archive.appointments WHERE id NOT IN (SELECT id FROM main.appointments))"""
+
+
+def union_archive(sql):
+    """
+    Return a SELECT written with {appointments} for the appointments table and {db}.
+    prefixes for the others as the UNION ALL of the live and archive databases;
+    callers pass their parameters twice and ORDER BY result columns. The archive half
+    skips appointments still in the live table, so no row is returned twice and none
+    has to be sorted away as a duplicate.
+    """
+    return (f"{sql.format(db='main', appointments='main.appointments')} UNION ALL "
+            f"{sql.format(db='archive', appointments=ARCHIVE_ONLY)}")
+
+
+def archive_appointments(conn, older_than_days=365, today=None, batch_size=500, max_batches=100):
+    """
+    Move finished appointments dated more than older_than_days ago, with their
+    treatments, into the archive in batched transactions; return the number moved.
+    In WAL mode a transaction spanning attached databases is atomic per database
+    only, so a crash can leave a batch in both: the archive copy is rewritten by
+    the next run (INSERT OR REPLACE) and union_archive() skips it meanwhile.
+    """
+    today = datetime.strptime(today, '%Y-%m-%d').date() if today else datetime.now().date()
+    cutoff = str(today - timedelta(days=older_than_days))
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)")
+    moved = 0
+    for _ in range(max_batches):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM temp.archive_batch")
+            count = conn.execute(f"""
+                INSERT INTO temp.archive_batch (id)
+                SELECT id FROM main.appointments
+                WHERE date < ? AND status IN ({', '.join('?' * len(FINISHED_STATUSES))})
+                LIMIT ?
+            """, (cutoff, *FINISHED_STATUSES, batch_size)).rowcount
+            conn.execute("""INSERT OR REPLACE INTO archive.appointments
+                            SELECT id, patient_id, doctor_id, date, time, status, reason, created_at
+                            FROM main.appointments WHERE id IN (SELECT id FROM temp.archive_batch)""")
+            conn.execute("""INSERT OR REPLACE INTO archive.treatments
+                            SELECT id, appointment_id, diagnosis, prescription, notes, created_at
+                            FROM main.treatments WHERE appointment_id IN (SELECT id FROM temp.archive_batch)""")
+            conn.execute("DELETE FROM main.treatments WHERE appointment_id IN (SELECT id FROM temp.archive_batch)")
+            conn.execute("DELETE FROM main.appointments WHERE id IN (SELECT id FROM temp.archive_batch)")
+            # The delete triggers decremented the per-status counters; archived
+            # appointments still count towards the dashboard totals
+            conn.execute("""
+                INSERT INTO stats (key, value)
+                SELECT 'appointments:' || a.status, COUNT(*)
+                FROM archive.appointments a JOIN temp.archive_batch b ON a.id = b.id
+                WHERE true
+                GROUP BY a.status
+                ON CONFLICT (key) DO UPDATE SET value = value + excluded.value
+            """)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        moved += count
+        if count < batch_size:
+            break
+    return moved
@@ -0,0 +1,130 @@
+"""
+Fingerprinted, pre-compressed static assets.
+build() copies every file under static/ to static/build/ with a content hash in
+its name (style.css -> style.3f2a9c1b7e4d.css), writes .gz and, if the brotli
+package is installed, .br variants next to it, and records the mapping in
+static/build/manifest.json. Templates link assets with asset_url('style.css');
+the hashed URLs never change content, so they are served with an immutable
+one-year Cache-Control and the best pre-compressed variant the client accepts.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Already-compressed formats gain nothing from another pass
+SKIP_COMPRESSION = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.woff', '.woff2', '.gz', '.br', '.zip')
+
+
+def _write(path, data):
+    # Workers may build at the same time; each file appears atomically
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def hashed_name(name, data):
+    """Return name with the first 12 hex digits of the content's sha256 before the extension"""
+    root, ext = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+class Assets:
+    """Builds and serves the fingerprinted copies of the files in a static folder"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.build_folder = os.path.join(static_folder, BUILD_DIR)
+        self.manifest_path = os.path.join(self.build_folder, MANIFEST)
+        self.manifest = {}
+
+    def sources(self):
+        """Yield the paths (relative to the static folder, '/'-separated) of the source assets"""
+        for root, dirs, files in os.walk(self.static_folder):
+            if root == self.static_folder and BUILD_DIR in dirs:
+                dirs.remove(BUILD_DIR)
+            for name in sorted(files):
+                yield os.path.relpath(os.path.join(root, name), self.static_folder).replace(os.sep, '/')
+
+    def stale(self):
+        """True if the manifest is missing or older than any source asset"""
+        try:
+            built = os.path.getmtime(self.manifest_path)
+        except OSError:
+            return True
+        return any(os.path.getmtime(os.path.join(self.static_folder, name)) > built for name in self.sources())
+
+    def build(self):
+        """Write the hashed and compressed copies plus the manifest; return the manifest"""
+        manifest = {}
+        for name in self.sources():
+            with open(os.path.join(self.static_folder, name), 'rb') as f:
+                data = f.read()
+            target = os.path.join(self.build_folder, hashed_name(name, data))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                _write(target, data)
+                if not name.lower().endswith(SKIP_COMPRESSION):
+                    # mtime=0 keeps the .gz bytes identical across builds
+                    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+                    if brotli is not None:
+                        variants['.br'] = brotli.compress(data)
+                    for ext, compressed in variants.items():
+                        if len(compressed) < len(data):
+                            _write(target + ext, compressed)
+            manifest[name] = os.path.relpath(target, self.build_folder).replace(os.sep, '/')
+        os.makedirs(self.build_folder, exist_ok=True)
+        _write(self.manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode())
+        self.manifest = manifest
+        return manifest
+
+    def load(self):
+        """Read the manifest written by build(); without one asset_url() falls back to plain static URLs"""
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        return self.manifest
+
+    def url(self, filename):
+        """URL of the fingerprinted copy of a static file, or its plain static URL if it was not built"""
+        hashed = self.manifest.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=hashed)
+
+    def serve(self, filename):
+        """Send a fingerprinted file, pre-compressed when the client accepts it, cached for a year"""
+        encodings = request.accept_encodings
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, ext in (('br', '.br'), ('gzip', '.gz')):
+            if encodings[encoding] and os.path.isfile(os.path.join(self.build_folder, filename + ext)):
+                response = send_from_directory(self.build_folder, filename + ext, mimetype=mimetype)
+                response.content_encoding = encoding
+                break
+        else:
+            response = send_from_directory(self.build_folder, filename, mimetype=mimetype)
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+
+def init_app(app, assets):
+    """Serve assets under <static url>/build/ and add asset_url() to the templates"""
+    app.add_url_rule(f'{app.static_url_path}/{BUILD_DIR}/<path:filename>', 'assets', assets.serve)
+    app.add_template_global(assets.url, 'asset_url')
+    assets.load()
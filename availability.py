@@ -0,0 +1,129 @@
+"""
+Recurring weekly availability rules.
+A rule such as "Mon-Fri 09:00-13:00 from 2024-06-01 until further notice" is stored
+once in availability_rules and expanded on demand for the requested dates, instead of
+being materialized as doctor_availability rows. availability_exceptions marks dates on
+which a doctor's recurring rules do not apply (one-off doctor_availability rows still do).
+Expanded weeks are cached per doctor and invalidated whenever the doctor's rules change;
+the cache only feeds what is displayed, bookings are checked against the tables
+(booking.WINDOWS_SQL).
+"""
+
+import json
+import threading
+from datetime import date as date_cls, timedelta
+
+from cache import TTLCache
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def weekday_mask(days):
+    """Build a bitmask (bit 0 = Monday) from weekday indexes; raises ValueError for anything but 0-6"""
+    mask = 0
+    for day in days:
+        day = str(day)
+        if not (day.isdecimal() and 0 <= int(day) <= 6):
+            raise ValueError(f'invalid weekday {day!r}')
+        mask |= 1 << int(day)
+    return mask
+
+
+def weekday_names(mask):
+    """Return the weekday names set in a bitmask, e.g. 'Mon, Tue'"""
+    return ', '.join(name for i, name in enumerate(WEEKDAYS) if mask & (1 << i))
+
+
+def _parse(value):
+    return date_cls.fromisoformat(value) if isinstance(value, str) else value
+
+
+class RecurringAvailability:
+    """Expands recurring rules into (date, start_time, end_time) windows with a per-week cache"""
+
+    def __init__(self, maxsize=4096, ttl=300):
+        self.weeks = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, doctor_id):
+        """Forget the cached weeks of one doctor after their rules or exceptions change"""
+        with self._lock:
+            self._versions[doctor_id] = self._versions.get(doctor_id, 0) + 1
+
+    def _key(self, doctor_id, monday):
+        return (doctor_id, self._versions.get(doctor_id, 0), monday)
+
+    def _week(self, conn, doctor_id, monday):
+        key = self._key(doctor_id, monday)
+        windows = self.weeks.get(key)
+        if windows is None:
+            windows = self._expand_weeks(conn, [doctor_id], monday)[doctor_id]
+            self.weeks.set(key, windows)
+        return windows
+
+    def _expand_weeks(self, conn, doctor_ids, monday):
+        """Expand one week for several doctors with one query each for rules and exceptions"""
+        sunday = monday + timedelta(days=6)
+        ids = json.dumps(list(doctor_ids))
+        rules, exceptions = {}, {}
+        for row in conn.execute("""
+            SELECT doctor_id, weekdays, start_time, end_time, valid_from, valid_until
+            FROM availability_rules
+            WHERE doctor_id IN (SELECT value FROM json_each(?))
+              AND valid_from <= ? AND (valid_until IS NULL OR valid_until >= ?)
+        """, (ids, str(sunday), str(monday))).fetchall():
+            rules.setdefault(row[0], []).append(tuple(row[1:]))
+        if rules:
+            for doctor_id, day in conn.execute("""
+                SELECT doctor_id, date FROM availability_exceptions
+                WHERE doctor_id IN (SELECT value FROM json_each(?)) AND date >= ? AND date <= ?
+            """, (json.dumps(list(rules)), str(monday), str(sunday))):
+                exceptions.setdefault(doctor_id, set()).add(day)
+
+        expanded = {}
+        for doctor_id in doctor_ids:
+            windows = []
+            for offset in range(7):
+                day_str = str(monday + timedelta(days=offset))
+                if day_str in exceptions.get(doctor_id, ()):
+                    continue
+                for weekdays, start_time, end_time, valid_from, valid_until in rules.get(doctor_id, ()):
+                    if (weekdays & (1 << offset) and valid_from <= day_str
+                            and (valid_until is None or day_str <= valid_until)):
+                        windows.append((day_str, start_time, end_time))
+            windows.sort()
+            expanded[doctor_id] = windows
+        return expanded
+
+    def windows(self, conn, doctor_id, date_from, date_to):
+        """Return recurring windows between date_from and date_to inclusive, ordered by date and start"""
+        date_from, date_to = _parse(date_from), _parse(date_to)
+        monday = date_from - timedelta(days=date_from.weekday())
+        first, last = str(date_from), str(date_to)
+        windows = []
+        while monday <= date_to:
+            windows.extend(w for w in self._week(conn, doctor_id, monday) if first <= w[0] <= last)
+            monday += timedelta(days=7)
+        return windows
+
+    def windows_many(self, conn, doctor_ids, date_from, date_to):
+        """Like windows() for several doctors, expanding uncached weeks in batches; returns {doctor_id: windows}"""
+        date_from, date_to = _parse(date_from), _parse(date_to)
+        monday = date_from - timedelta(days=date_from.weekday())
+        first, last = str(date_from), str(date_to)
+        result = {doctor_id: [] for doctor_id in doctor_ids}
+        while monday <= date_to:
+            weeks, missing = {}, []
+            for doctor_id in result:
+                weeks[doctor_id] = self.weeks.get(self._key(doctor_id, monday))
+                if weeks[doctor_id] is None:
+                    missing.append(doctor_id)
+            if missing:
+                for doctor_id, windows in self._expand_weeks(conn, missing, monday).items():
+                    self.weeks.set(self._key(doctor_id, monday), windows)
+                    weeks[doctor_id] = windows
+            for doctor_id, windows in weeks.items():
+                result[doctor_id].extend(w for w in windows if first <= w[0] <= last)
+            monday += timedelta(days=7)
+        return result
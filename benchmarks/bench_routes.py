@@ -0,0 +1,256 @@
+"""
+Route-level benchmark for the Hospital Management System.
+
+Drives every main route (dashboards for each role, doctor search, booking, admin
+listings and the /api endpoints) through the Flask test client with concurrent
+workers, then reports p50/p95/p99 latency per route, overall throughput and peak
+RSS. Results are written as JSON so runs can be compared with --compare.
+
+Populate the database first with benchmarks/generate_data.py --anchor-date today, so
+the generated availability covers the dates the routes look at.
+
+Usage: python benchmarks/bench_routes.py --db hospital.db --workers 8 --iterations 50 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from app import app, init_db
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def discover(conn):
+    """Pick the accounts and ids the scenarios need from the database"""
+    doctor = conn.execute("""
+        SELECT d.id, u.username FROM doctors d JOIN users u ON d.user_id = u.id
+        WHERE d.is_active = 1 AND u.password = 'password' ORDER BY d.id LIMIT 1
+    """).fetchone()
+    patient = conn.execute("""
+        SELECT p.id, u.username FROM patients p JOIN users u ON p.user_id = u.id
+        WHERE u.password = 'password' ORDER BY p.id LIMIT 1
+    """).fetchone()
+    if doctor is None or patient is None:
+        raise SystemExit('No generated accounts found; run benchmarks/generate_data.py first')
+    appointment = conn.execute("SELECT id FROM appointments WHERE doctor_id = ? ORDER BY id DESC LIMIT 1",
+                               (doctor[0],)).fetchone()
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ('doctors', 'patients', 'appointments', 'treatments', 'doctor_availability')}
+    return {
+        'doctor_id': doctor[0], 'doctor_username': doctor[1],
+        'patient_id': patient[0], 'patient_username': patient[1],
+        'appointment_id': appointment[0] if appointment else None,
+        'counts': counts,
+    }
+
+
+def scenarios(info, writes=False):
+    """Return {role: [(route_name, method, path, data)]}"""
+    today = date.today()
+    tomorrow = str(today + timedelta(days=1))
+    doctor_id = info['doctor_id']
+    routes = {
+        'admin': [
+            ('admin.dashboard', 'GET', '/dashboard', None),
+            ('admin.doctors', 'GET', '/admin/doctors', None),
+            ('admin.patients', 'GET', '/admin/patients', None),
+            ('admin.patients.search', 'GET', '/admin/patients?search=sharma', None),
+            ('admin.appointments', 'GET', '/admin/appointments', None),
+        ],
+        'doctor': [
+            ('doctor.dashboard', 'GET', '/dashboard', None),
+            ('doctor.appointments', 'GET', '/doctor/appointments', None),
+            ('doctor.availability', 'GET', '/doctor/availability', None),
+        ],
+        'patient': [
+            ('patient.dashboard', 'GET', '/dashboard', None),
+            ('patient.search_doctors', 'GET', '/patient/search-doctors', None),
+            ('patient.search_doctors.name', 'GET', '/patient/search-doctors?name=ra', None),
+            ('patient.search_doctors.soonest', 'GET', '/patient/search-doctors?sort=soonest', None),
+            ('patient.book_appointment', 'GET', f'/patient/book-appointment/{doctor_id}', None),
+            ('patient.profile', 'GET', '/patient/profile', None),
+            ('api.doctors', 'GET', '/api/doctors', None),
+            ('api.appointments', 'GET', f'/api/appointments/{doctor_id}', None),
+            ('api.appointments.stream', 'GET', f'/api/appointments/{doctor_id}?stream=1', None),
+            ('api.free_slots', 'GET', f'/api/doctors/{doctor_id}/free-slots', None),
+        ],
+    }
+    if info['appointment_id']:
+        routes['doctor'].append(('doctor.complete_appointment', 'GET',
+                                 f"/doctor/complete/{info['appointment_id']}", None))
+    if writes:
+        routes['patient'].append(('patient.book_appointment.post', 'POST', f'/patient/book-appointment/{doctor_id}',
+                                  {'date': tomorrow, 'time': '12:00', 'reason': 'benchmark'}))
+    return routes
+
+
+def login(client, username, password, role):
+    response = client.post('/login', data={'username': username, 'password': password, 'role': role})
+    if response.status_code != 302:
+        raise SystemExit(f'login failed for {role} {username}')
+
+
+def run(info, args):
+    routes = scenarios(info, writes=args.writes)
+    credentials = {
+        'admin': ('admin', 'admin123'),
+        'doctor': (info['doctor_username'], 'password'),
+        'patient': (info['patient_username'], 'password'),
+    }
+    jobs = queue.Queue()
+    plan = [(role, route) for role, role_routes in routes.items() for route in role_routes] * args.iterations
+    random.Random(args.seed).shuffle(plan)
+    for job in plan:
+        jobs.put(job)
+
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def worker():
+        clients = {}
+        for role, (username, password) in credentials.items():
+            clients[role] = app.test_client()
+            login(clients[role], username, password, role)
+        local = {}
+        local_errors = {}
+        while True:
+            try:
+                role, (name, method, path, data) = jobs.get_nowait()
+            except queue.Empty:
+                break
+            started = time.perf_counter()
+            try:
+                response = clients[role].open(path, method=method, data=data)
+                response.get_data()
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            local.setdefault(name, []).append((time.perf_counter() - started) * 1000.0)
+            if failed:
+                local_errors[name] = local_errors.get(name, 0) + 1
+        with lock:
+            for name, values in local.items():
+                latencies.setdefault(name, []).extend(values)
+            for name, count in local_errors.items():
+                errors[name] = errors.get(name, 0) + count
+
+    # Warm-up pass so caches and connection pool are in steady state
+    for role, (username, password) in credentials.items():
+        client = app.test_client()
+        login(client, username, password, role)
+        for name, method, path, data in routes[role]:
+            if method == 'GET':
+                client.get(path).get_data()
+
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        results[name] = {
+            'count': len(values),
+            'errors': errors.get(name, 0),
+            'mean_ms': sum(values) / len(values),
+            'p50_ms': percentile(values, 50),
+            'p95_ms': percentile(values, 95),
+            'p99_ms': percentile(values, 99),
+            'max_ms': values[-1],
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        'requests': total,
+        'seconds': elapsed,
+        'throughput_rps': total / elapsed if elapsed else 0.0,
+        'routes': results,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, baseline=None):
+    base_routes = (baseline or {}).get('routes', {})
+    print(f"{'route':<34}{'count':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          + (f"{'p50 Δ%':>10}" if baseline else ''))
+    for name, stats in report['routes'].items():
+        line = (f"{name:<34}{stats['count']:>7}{stats['errors']:>5}"
+                f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+        if name in base_routes and base_routes[name]['p50_ms']:
+            line += f"{(stats['p50_ms'] / base_routes[name]['p50_ms'] - 1) * 100:>+10.1f}"
+        print(line)
+    print(f"\n{report['requests']} requests in {report['seconds']:.2f}s, "
+          f"{report['throughput_rps']:.1f} req/s, peak RSS {report['peak_rss_kb'] / 1024:.1f} MiB")
+    if baseline:
+        print(f"baseline: {baseline.get('throughput_rps', 0):.1f} req/s ({baseline.get('revision')})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', default='hospital.db')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=50, help='requests per route')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--writes', action='store_true', help='also benchmark booking POSTs')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to compare p50 latencies against')
+    args = parser.parse_args()
+
+    app.config['DATABASE'] = args.db
+    init_db()
+    with app.app_context():
+        info = discover(db.get_db())
+
+    report = run(info, args)
+    report.update({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'workers': args.workers,
+        'iterations': args.iterations,
+        'data': info['counts'],
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    })
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
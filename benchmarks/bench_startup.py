@@ -0,0 +1,101 @@
+"""
+Startup-time benchmark for the Hospital Management System.
+
+Starts fresh interpreter processes the way a WSGI server would (import app, then
+create_app()) and times the import, create_app() and the first request, both
+against a new database (cold: schema created) and an existing one (warm: schema
+check only). It then starts --workers processes at once on a new database, as a
+pre-forking server does, and checks that every one of them comes up and that the
+schema was created exactly once.
+
+Usage: python benchmarks/bench_startup.py --runs 5 --workers 8 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in each child process; settings come from HMS_* environment variables like in production
+CHILD = r"""
+import json, logging, time
+logging.basicConfig(level=logging.INFO)
+started = time.perf_counter()
+import app as appmod
+imported = time.perf_counter()
+app = appmod.create_app()
+created = time.perf_counter()
+client = app.test_client()
+status = client.get('/login').status_code
+first = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (first - created) * 1000, 'total_ms': (first - started) * 1000,
+                  'status': status}))
+"""
+
+
+def start(database, env=None):
+    env = dict(os.environ, HMS_DATABASE=database, HMS_JOBS_ENABLED='false', **(env or {}))
+    return subprocess.Popen([sys.executable, '-c', CHILD], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def result(process):
+    out, err = process.communicate()
+    if process.returncode != 0:
+        raise SystemExit(f'worker failed:\n{err}')
+    # create_schema() logs the schema version to stderr each time it runs
+    return json.loads(out.strip().splitlines()[-1]), err.count('Schema at version')
+
+
+def summarize(samples):
+    return {key: statistics.median(sample[key] for sample in samples)
+            for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5, help='processes timed per scenario')
+    parser.add_argument('--workers', type=int, default=8, help='processes started at once in the fork test')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='hms-startup-')
+    cold, warm = [], []
+    for i in range(args.runs):
+        database = os.path.join(tmp, f'cold{i}.db')
+        cold.append(result(start(database))[0])
+        warm.append(result(start(database))[0])
+
+    database = os.path.join(tmp, 'workers.db')
+    processes = [start(database) for _ in range(args.workers)]
+    outcomes = [result(process) for process in processes]
+    concurrent = {
+        'workers': args.workers,
+        'ok': sum(1 for sample, _ in outcomes if sample['status'] == 200),
+        'schema_created': sum(created for _, created in outcomes),
+        'max_total_ms': max(sample['total_ms'] for sample, _ in outcomes),
+    }
+
+    report = {'cold': summarize(cold), 'warm': summarize(warm), 'concurrent': concurrent}
+    print(f"{'scenario':<10}{'import ms':>12}{'create_app ms':>15}{'1st request ms':>16}{'total ms':>11}")
+    for name in ('cold', 'warm'):
+        stats = report[name]
+        print(f"{name:<10}{stats['import_ms']:>12.1f}{stats['create_app_ms']:>15.1f}"
+              f"{stats['first_request_ms']:>16.1f}{stats['total_ms']:>11.1f}")
+    print(f"\n{concurrent['ok']}/{concurrent['workers']} workers started together answered 200, "
+          f"schema created {concurrent['schema_created']} time(s), slowest {concurrent['max_total_ms']:.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Multithreaded stress test for the appointment booking engine.
+
+Many threads race to book a small pool of slots through booking.book(). At the end
+the script verifies that no (doctor, date, time) slot holds more than one active
+appointment and reports the booking throughput.
+
+Usage: python benchmarks/booking_stress.py [--threads 16] [--attempts 500] [--doctors 20] [--slots 32]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import booking
+import db
+from app import app, init_db
+
+
+def seed(conn, doctors, slots):
+    """Create doctors, a pool of patients and availability covering every slot"""
+    conn.execute("BEGIN")
+    for i in range(doctors):
+        user_id = conn.execute("INSERT INTO users (username, password, role) VALUES (?, 'x', 'doctor')",
+                               (f'stress_doctor_{i}',)).lastrowid
+        conn.execute("INSERT INTO doctors (user_id, name, specialization, department_id) VALUES (?, ?, 'General', 1)",
+                     (user_id, f'Doctor {i}'))
+    for i in range(100):
+        user_id = conn.execute("INSERT INTO users (username, password, role) VALUES (?, 'x', 'patient')",
+                               (f'stress_patient_{i}',)).lastrowid
+        conn.execute("INSERT INTO patients (user_id, name) VALUES (?, ?)", (user_id, f'Patient {i}'))
+    day_minutes = slots * 15
+    end = f'{9 + day_minutes // 60:02d}:{day_minutes % 60:02d}'
+    conn.executemany("INSERT INTO doctor_availability (doctor_id, date, start_time, end_time) VALUES (?, '2030-01-01', '09:00', ?)",
+                     [(doctor_id, end) for doctor_id in range(1, doctors + 1)])
+    conn.commit()
+
+
+def worker(pool, attempts, doctors, slots, results, seed_value):
+    rng = random.Random(seed_value)
+    booked = taken = 0
+    conn = pool.acquire()
+    try:
+        for _ in range(attempts):
+            doctor_id = rng.randint(1, doctors)
+            minutes = 9 * 60 + 15 * rng.randrange(slots)
+            slot = f'{minutes // 60:02d}:{minutes % 60:02d}'
+            try:
+                booking.book(conn, rng.randint(1, 100), doctor_id, '2030-01-01', slot, 'stress', slot_minutes=15)
+                booked += 1
+            except booking.SlotTaken:
+                taken += 1
+    finally:
+        pool.release(conn)
+    results.append((booked, taken))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--attempts', type=int, default=500, help='booking attempts per thread')
+    parser.add_argument('--doctors', type=int, default=20)
+    parser.add_argument('--slots', type=int, default=32, help='15-minute slots per doctor')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config['DATABASE'] = os.path.join(tmp, 'stress.db')
+        init_db()
+        pool = db.get_pool(app)
+        conn = pool.acquire()
+        seed(conn, args.doctors, args.slots)
+        pool.release(conn)
+
+        results = []
+        threads = [threading.Thread(target=worker, args=(pool, args.attempts, args.doctors, args.slots, results, i))
+                   for i in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        conn = pool.acquire()
+        duplicates = conn.execute("""
+            SELECT doctor_id, date, time, COUNT(*) FROM appointments
+            WHERE status != 'Cancelled'
+            GROUP BY doctor_id, date, time HAVING COUNT(*) > 1
+        """).fetchall()
+        active = conn.execute("SELECT COUNT(*) FROM appointments WHERE status != 'Cancelled'").fetchone()[0]
+        pool.release(conn)
+        pool.close()
+
+    booked = sum(b for b, _ in results)
+    taken = sum(t for _, t in results)
+    attempts = booked + taken
+    print(f'threads={args.threads} attempts={attempts} booked={booked} rejected={taken} '
+          f'capacity={args.doctors * args.slots}')
+    print(f'elapsed={elapsed:.3f}s attempts/s={attempts / elapsed:.0f} bookings/s={booked / elapsed:.0f}')
+
+    if duplicates or active != booked or booked > args.doctors * args.slots:
+        print(f'FAIL: double bookings detected: {duplicates}')
+        return 1
+    print('OK: no double bookings')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Deterministic synthetic data generator for hospital.db.
+
+Fills the database with departments, doctors, patients, availability, appointments
+and treatments at a configurable scale (up to millions of rows). Dates are laid out
+around --anchor-date (a fixed date by default, or 'today'), so the same --seed and
+anchor always produce the same data. Generated accounts use the password 'password' and
+are named doctor<N> / patient<N>, which benchmarks/bench_routes.py relies on.
+
+Usage: python benchmarks/generate_data.py --db hospital.db --doctors 500 --patients 100000 --appointments 1000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, init_db
+
+FIRST_NAMES = ['Aarav', 'Diya', 'Vihaan', 'Ananya', 'Arjun', 'Isha', 'Kabir', 'Meera', 'Rohan', 'Saanvi',
+               'James', 'Maria', 'Wei', 'Fatima', 'Lucas', 'Amara', 'Noah', 'Yuki', 'Omar', 'Elena']
+LAST_NAMES = ['Sharma', 'Patel', 'Reddy', 'Iyer', 'Khan', 'Singh', 'Das', 'Nair', 'Gupta', 'Rao',
+              'Smith', 'Garcia', 'Chen', 'Ali', 'Silva', 'Okafor', 'Brown', 'Tanaka', 'Haddad', 'Novak']
+EXTRA_DEPARTMENTS = ['Oncology', 'Gastroenterology', 'Nephrology', 'Ophthalmology', 'ENT', 'Psychiatry',
+                     'Urology', 'Endocrinology', 'Rheumatology', 'Radiology', 'Anesthesiology', 'Hematology']
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+SLOT_TIMES = [f'{9 + i // 2:02d}:{30 * (i % 2):02d}' for i in range(16)]
+# Day the generated history ends and the future availability starts
+DEFAULT_ANCHOR = '2026-01-01'
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+def person_name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def next_id(conn, table):
+    return conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+
+
+def insert(conn, sql, rows, batch_size):
+    count = 0
+    for batch in batched(rows, batch_size):
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def anchor_date(value):
+    """argparse type for --anchor-date"""
+    if value == 'today':
+        return date.today()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD or 'today', got {value!r}")
+
+
+def generate(conn, args):
+    rng = random.Random(args.seed)
+    today = args.anchor_date
+    report = {}
+
+    def timed(name, func):
+        started = time.perf_counter()
+        conn.execute("BEGIN")
+        count = func()
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        report[name] = count
+        print(f'{name:>14}: {count:>10,} rows in {elapsed:6.2f}s ({count / elapsed if elapsed else 0:,.0f} rows/s)')
+
+    def departments():
+        wanted = EXTRA_DEPARTMENTS[:max(0, args.departments - 7)]
+        conn.executemany("INSERT OR IGNORE INTO departments (name, description) VALUES (?, ?)",
+                         [(name, f'{name} department') for name in wanted])
+        return len(wanted)
+
+    timed('departments', departments)
+    department_ids = [row[0] for row in conn.execute("SELECT id FROM departments ORDER BY id")]
+
+    user_base = next_id(conn, 'users')
+    doctor_base = next_id(conn, 'doctors')
+
+    def doctors():
+        conn.executemany("INSERT INTO users (id, username, password, role) VALUES (?, ?, 'password', 'doctor')",
+                         ((user_base + i, f'doctor{i}') for i in range(args.doctors)))
+        return insert(conn, """INSERT INTO doctors (id, user_id, name, specialization, department_id, phone, email, experience)
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                      ((doctor_base + i, user_base + i, person_name(rng), 'Consultant',
+                        department_ids[i % len(department_ids)], f'9{i:09d}', f'doctor{i}@hospital.test',
+                        rng.randint(1, 35)) for i in range(args.doctors)), args.batch_size)
+
+    timed('doctors', doctors)
+
+    user_base = next_id(conn, 'users')
+    patient_base = next_id(conn, 'patients')
+
+    def patients():
+        insert(conn, "INSERT INTO users (id, username, password, role) VALUES (?, ?, 'password', 'patient')",
+               ((user_base + i, f'patient{i}') for i in range(args.patients)), args.batch_size)
+        return insert(conn, """INSERT INTO patients (id, user_id, name, age, gender, phone, email, address, blood_group)
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                      ((patient_base + i, user_base + i, person_name(rng), rng.randint(1, 95),
+                        rng.choice(['Male', 'Female', 'Other']), f'8{i:09d}', f'patient{i}@mail.test',
+                        f'{rng.randint(1, 999)} Main Street', rng.choice(BLOOD_GROUPS))
+                       for i in range(args.patients)), args.batch_size)
+
+    timed('patients', patients)
+
+    def availability():
+        return insert(conn, """INSERT INTO doctor_availability (doctor_id, date, start_time, end_time)
+                               VALUES (?, ?, '09:00', '17:00')""",
+                      ((doctor_base + d, str(today + timedelta(days=day)))
+                       for d in range(args.doctors) for day in range(args.availability_days)), args.batch_size)
+
+    timed('availability', availability)
+
+    # Each doctor's appointments walk their (date, time) slot grid with a stride coprime
+    # to its size, so slots never repeat and no set of used slots has to be kept in memory.
+    first_day = today - timedelta(days=args.history_days)
+    total_days = args.history_days + args.availability_days
+    grid = total_days * len(SLOT_TIMES)
+    stride = next(p for p in range(grid // 3 + 1, grid) if gcd(p, grid) == 1) if grid > 3 else 1
+    per_doctor = min(grid, -(-args.appointments // max(args.doctors, 1)))
+    appointment_base = next_id(conn, 'appointments')
+
+    def appointment_rows():
+        k = 0
+        for j in range(per_doctor):
+            for d in range(args.doctors):
+                if k >= args.appointments:
+                    return
+                slot = (j * stride + d) % grid
+                day = first_day + timedelta(days=slot // len(SLOT_TIMES))
+                roll = rng.random()
+                if day < today:
+                    status = 'Completed' if roll < 0.75 else 'Cancelled' if roll < 0.85 else 'Booked'
+                else:
+                    status = 'Cancelled' if roll < 0.1 else 'Booked'
+                yield (appointment_base + k, patient_base + rng.randrange(max(args.patients, 1)), doctor_base + d,
+                       str(day), SLOT_TIMES[slot % len(SLOT_TIMES)], status, 'Routine consultation')
+                k += 1
+
+    def appointments():
+        return insert(conn, """INSERT INTO appointments (id, patient_id, doctor_id, date, time, status, reason)
+                               VALUES (?, ?, ?, ?, ?, ?, ?)""", appointment_rows(), args.batch_size)
+
+    if args.doctors and args.patients:
+        timed('appointments', appointments)
+
+    def treatments():
+        cursor = conn.execute("SELECT id FROM appointments WHERE id >= ? AND status = 'Completed'",
+                              (appointment_base,))
+        rows = ((row[0], rng.choice(['Viral fever', 'Hypertension', 'Migraine', 'Sprain', 'Dermatitis']),
+                 rng.choice(['Paracetamol 500mg', 'Rest and fluids', 'Amlodipine 5mg', 'Physiotherapy']),
+                 'Follow up in two weeks') for row in cursor)
+        return insert(conn, """INSERT INTO treatments (appointment_id, diagnosis, prescription, notes)
+                               VALUES (?, ?, ?, ?)""", rows, args.batch_size)
+
+    timed('treatments', treatments)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', default='hospital.db')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor-date', type=anchor_date, default=DEFAULT_ANCHOR,
+                        help=f"YYYY-MM-DD or 'today': end of the history, start of availability (default {DEFAULT_ANCHOR})")
+    parser.add_argument('--departments', type=int, default=12)
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--appointments', type=int, default=200000)
+    parser.add_argument('--history-days', type=int, default=365, help='days of past appointments')
+    parser.add_argument('--availability-days', type=int, default=30, help='days of future availability')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    app.config['DATABASE'] = args.db
+    init_db()
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    started = time.perf_counter()
+    generate(conn, args)
+    conn.execute("ANALYZE")
+    conn.close()
+    print(f'done in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""
+Appointment slot booking engine.
+A slot is claimed with a single INSERT inside a BEGIN IMMEDIATE transaction; the
+partial unique index idx_appointments_active_slot (db.py migration 5) guarantees
+that two concurrent requests can never both hold the same (doctor, date, time).
+Slots are slot_minutes long and start on the grid counted from the start of an
+availability window (as slots.free_slots offers them), and no two active
+appointments of a doctor may start less than slot_minutes apart.
+apply_batch() books, cancels and completes many appointments in one such transaction.
+"""
+
+import json
+import re
+import sqlite3
+from datetime import datetime
+
+import repository
+from slots import merge_windows, to_minutes
+
+
+TIME_RE = re.compile(r'^([01]\d|2[0-3]):[0-5]\d$')
+
+
+def is_date(value):
+    """True if value is a zero-padded YYYY-MM-DD calendar date"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d') == value
+    except (TypeError, ValueError):
+        return False
+
+
+def is_time(value):
+    """True if value is an HH:MM time of day"""
+    return isinstance(value, str) and TIME_RE.match(value) is not None
+
+
+class BookingError(Exception):
+    """Base class for booking failures, carrying a user-facing message"""
+    message = 'Unable to book this appointment!'
+
+    def __str__(self):
+        return self.message
+
+
+class SlotTaken(BookingError):
+    message = 'This time slot is already booked!'
+
+
+class OutsideAvailability(BookingError):
+    message = 'The doctor is not available at this time!'
+
+
+class InvalidSlot(BookingError):
+    message = 'Please choose a valid date and time!'
+
+
+class AppointmentNotFound(BookingError):
+    message = 'Appointment not found!'
+
+
+class NotAllowed(BookingError):
+    message = 'You are not allowed to change this appointment!'
+
+
+class NotBooked(BookingError):
+    message = 'Only booked appointments can be cancelled or completed!'
+
+
+class InvalidOperation(BookingError):
+    """A batch operation that is malformed or refers to a missing doctor or patient"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def on_grid(windows, time, slot_minutes):
+    """Return True if a whole slot starting at time fits one of the (start, end) minute windows, on its grid"""
+    minute = to_minutes(time)
+    return any(start <= minute and minute + slot_minutes <= end and (minute - start) % slot_minutes == 0
+               for start, end in merge_windows(windows))
+
+
+def overlaps(booked, time, slot_minutes):
+    """Return True if a slot starting at time overlaps one starting at any of the booked minutes"""
+    minute = to_minutes(time)
+    return any(abs(other - minute) < slot_minutes for other in booked)
+
+
+# Availability windows of each [doctor_id, date] pair in the JSON parameter: one-off
+# doctor_availability rows, plus recurring rules on that weekday unless the date is an
+# exception. Read from the tables (not the display cache) inside the booking transaction.
+WINDOWS_SQL = """
+    WITH days AS (
+        SELECT json_extract(value, '$[0]') AS doctor_id, json_extract(value, '$[1]') AS date FROM json_each(?)
+    )
+    SELECT d.doctor_id, d.date, v.start_time, v.end_time FROM days d
+    JOIN doctor_availability v ON v.doctor_id = d.doctor_id AND v.date = d.date
+    WHERE v.is_available = 1
+    UNION ALL
+    SELECT d.doctor_id, d.date, r.start_time, r.end_time FROM days d
+    JOIN availability_rules r ON r.doctor_id = d.doctor_id
+    WHERE r.valid_from <= d.date AND (r.valid_until IS NULL OR r.valid_until >= d.date)
+      -- bit 0 is Monday; strftime('%w') counts from Sunday
+      AND r.weekdays & (1 << ((CAST(strftime('%w', d.date) AS INTEGER) + 6) % 7))
+      AND NOT EXISTS (SELECT 1 FROM availability_exceptions e WHERE e.doctor_id = d.doctor_id AND e.date = d.date)
+"""
+
+
+def day_windows(conn, days):
+    """Return {(doctor_id, date): [(start, end) minute windows]} for the given (doctor_id, date) pairs"""
+    days = sorted(set(days))
+    windows = {day: [] for day in days}
+    for doctor_id, date, start, end in conn.execute(WINDOWS_SQL, (json.dumps(days),)):
+        windows[(doctor_id, date)].append((to_minutes(start), to_minutes(end)))
+    return windows
+
+
+def within_availability(conn, doctor_id, date, time, slot_minutes=30):
+    """
+    Return True if a slot starting at time lies on the slot grid of one of the
+    doctor's one-off or recurring availability windows on date
+    """
+    return on_grid(day_windows(conn, [(doctor_id, date)])[(doctor_id, date)], time, slot_minutes)
+
+
+def booked_minutes(conn, doctor_id, date):
+    """Return the start minutes of the doctor's active appointments on date"""
+    return [to_minutes(time) for (time,) in conn.execute("""
+        SELECT time FROM appointments WHERE doctor_id = ? AND date = ? AND status != 'Cancelled'
+    """, (doctor_id, date))]
+
+
+def book(conn, patient_id, doctor_id, date, time, reason=None, slot_minutes=30):
+    """
+    Atomically book a slot and return the new appointment id.
+
+    Raises InvalidSlot unless date is YYYY-MM-DD and time HH:MM, OutsideAvailability
+    unless the slot is on the grid of a one-off window or a recurring rule, and
+    SlotTaken if it overlaps another active appointment.
+    """
+    if not (is_date(date) and is_time(time)):
+        raise InvalidSlot()
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not within_availability(conn, doctor_id, date, time, slot_minutes):
+            raise OutsideAvailability()
+        if overlaps(booked_minutes(conn, doctor_id, date), time, slot_minutes):
+            raise SlotTaken()
+        cursor = conn.execute("""INSERT INTO appointments (patient_id, doctor_id, date, time, reason)
+                                 VALUES (?, ?, ?, ?, ?)""",
+                              (patient_id, doctor_id, date, time, reason))
+        conn.commit()
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        raise SlotTaken()
+    except BaseException:
+        conn.rollback()
+        raise
+    return cursor.lastrowid
+
+
+# Batch operations
+
+OPERATIONS = ('book', 'cancel', 'complete')
+
+
+def _id(item, field):
+    value = item.get(field)
+    # isdecimal(), not isdigit(): superscripts like '²' are digits that int() rejects
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdecimal():
+        raise InvalidOperation(f'{field} must be a whole number')
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidOperation(f'{field} must be a whole number')
+
+
+def _text(item, field):
+    value = item.get(field)
+    return None if value is None else str(value)
+
+
+def _parse(item, role, patient_id, doctor_id):
+    """Check one operation's shape and the caller's right to it; return it normalized"""
+    if not isinstance(item, dict):
+        raise InvalidOperation('each operation must be an object')
+    op = item.get('op')
+    if op not in OPERATIONS:
+        raise InvalidOperation(f"op must be one of {', '.join(OPERATIONS)}")
+    if op == 'book':
+        if role == 'patient':
+            if item.get('patient_id') is not None and _id(item, 'patient_id') != patient_id:
+                raise NotAllowed()
+            patient = patient_id
+        else:
+            patient = _id(item, 'patient_id')
+        doctor = _id(item, 'doctor_id')
+        if role == 'doctor' and doctor != doctor_id:
+            raise NotAllowed()
+        date, time = item.get('date'), item.get('time')
+        if not is_date(date):
+            raise InvalidOperation('date must be a date in YYYY-MM-DD format')
+        if not is_time(time):
+            raise InvalidOperation('time must be a time in HH:MM format')
+        return {'op': op, 'patient_id': patient, 'doctor_id': doctor, 'date': date, 'time': time,
+                'reason': _text(item, 'reason')}
+    if op == 'complete' and role == 'patient':
+        raise NotAllowed()
+    return {'op': op, 'appointment_id': _id(item, 'appointment_id'), 'diagnosis': _text(item, 'diagnosis'),
+            'prescription': _text(item, 'prescription'), 'notes': _text(item, 'notes')}
+
+
+def _load(conn, parsed):
+    """
+    Read everything the batch is validated against with one query per kind: the
+    appointments it changes, the doctors and patients it books for, and the availability
+    windows and active appointment starts of every (doctor, date) it books on.
+    """
+    bookings = [op for op in parsed.values() if op['op'] == 'book']
+    appointment_ids = json.dumps(sorted({op['appointment_id'] for op in parsed.values() if op['op'] != 'book'}))
+    appointments = {row[0]: list(row[1:]) for row in conn.execute("""
+        SELECT id, patient_id, doctor_id, date, time, status FROM appointments
+        WHERE id IN (SELECT value FROM json_each(?))
+    """, (appointment_ids,))}
+    if not bookings:
+        return appointments, set(), set(), {}, {}
+
+    doctors = repository.doctors_by_ids(conn, [op['doctor_id'] for op in bookings])
+    patients = repository.patients_by_ids(conn, [op['patient_id'] for op in bookings])
+    days = sorted({(op['doctor_id'], op['date']) for op in bookings})
+    windows = day_windows(conn, days)
+    booked = {day: [] for day in days}
+    for doctor, date, time in conn.execute("""
+        SELECT a.doctor_id, a.date, a.time FROM json_each(?) s
+        JOIN appointments a
+          ON a.doctor_id = json_extract(s.value, '$[0]') AND a.date = json_extract(s.value, '$[1]')
+        WHERE a.status != 'Cancelled'
+    """, (json.dumps(days),)):
+        booked[(doctor, date)].append(to_minutes(time))
+    return appointments, doctors, patients, windows, booked
+
+
+def apply_batch(conn, operations, role, patient_id=None, doctor_id=None, atomic=False, slot_minutes=30):
+    """
+    Validate and apply a list of book / cancel / complete operations in one
+    BEGIN IMMEDIATE transaction, in list order (so a slot cancelled earlier in the
+    batch can be booked again later in it). Bookings are checked like book() checks
+    them, against the batch's own earlier bookings too. Patients may only book for themselves
+    and cancel their own appointments; doctors may only act on their own schedule.
+
+    Returns (results, applied): one {'index', 'op', 'ok', ...} dict per operation,
+    with 'appointment_id' on success and 'error' on failure, and the number of
+    operations written. With atomic=True a single failure rolls the whole batch back.
+    """
+    results = [None] * len(operations)
+    parsed = {}
+    for index, item in enumerate(operations):
+        try:
+            parsed[index] = _parse(item, role, patient_id, doctor_id)
+        except BookingError as e:
+            op = item.get('op') if isinstance(item, dict) else None
+            results[index] = {'index': index, 'op': op, 'ok': False, 'error': str(e)}
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        appointments, doctors, patients, windows, booked = _load(conn, parsed)
+        for index, op in parsed.items():
+            try:
+                if op['op'] == 'book':
+                    if op['doctor_id'] not in doctors:
+                        raise InvalidOperation('Doctor not found!')
+                    if op['patient_id'] not in patients:
+                        raise InvalidOperation('Patient not found!')
+                    day = (op['doctor_id'], op['date'])
+                    if not on_grid(windows[day], op['time'], slot_minutes):
+                        raise OutsideAvailability()
+                    if overlaps(booked[day], op['time'], slot_minutes):
+                        raise SlotTaken()
+                    try:
+                        appointment_id = conn.execute("""
+                            INSERT INTO appointments (patient_id, doctor_id, date, time, reason)
+                            VALUES (?, ?, ?, ?, ?)
+                        """, (op['patient_id'], op['doctor_id'], op['date'], op['time'], op['reason'])).lastrowid
+                    except sqlite3.IntegrityError:
+                        raise SlotTaken()
+                    booked[day].append(to_minutes(op['time']))
+                    appointments[appointment_id] = [op['patient_id'], op['doctor_id'], op['date'], op['time'], 'Booked']
+                else:
+                    appointment_id = op['appointment_id']
+                    appointment = appointments.get(appointment_id)
+                    if appointment is None:
+                        raise AppointmentNotFound()
+                    owner_patient, owner_doctor, date, time, status = appointment
+                    if ((role == 'patient' and owner_patient != patient_id)
+                            or (role == 'doctor' and owner_doctor != doctor_id)):
+                        raise NotAllowed()
+                    if status != 'Booked':
+                        raise NotBooked()
+                    if op['op'] == 'cancel':
+                        conn.execute("UPDATE appointments SET status = 'Cancelled' WHERE id = ?", (appointment_id,))
+                        appointment[4] = 'Cancelled'
+                        if (owner_doctor, date) in booked:
+                            booked[(owner_doctor, date)].remove(to_minutes(time))
+                    else:
+                        conn.execute("UPDATE appointments SET status = 'Completed' WHERE id = ?", (appointment_id,))
+                        conn.execute("""INSERT INTO treatments (appointment_id, diagnosis, prescription, notes)
+                                        VALUES (?, ?, ?, ?)""",
+                                     (appointment_id, op['diagnosis'], op['prescription'], op['notes']))
+                        appointment[4] = 'Completed'
+                results[index] = {'index': index, 'op': op['op'], 'ok': True, 'appointment_id': appointment_id}
+            except BookingError as e:
+                results[index] = {'index': index, 'op': op['op'], 'ok': False, 'error': str(e)}
+
+        applied = sum(1 for result in results if result['ok'])
+        if atomic and applied < len(results):
+            conn.rollback()
+            applied = 0
+            for result in results:
+                if result['ok']:
+                    result.update(ok=False, error='Not applied: another operation in the batch failed')
+                    if result['op'] == 'book':
+                        del result['appointment_id']
+        else:
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return results, applied
@@ -0,0 +1,163 @@
+"""
+In-process caches for the Hospital Management System.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time-to-live"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entries if full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def configure(self, maxsize, ttl):
+        """Apply new limits, evicting the least recently used entries beyond maxsize"""
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
+class FragmentCache:
+    """Thread-safe LRU cache of rendered strings bounded by their total memory size"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self.by_name = {}
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, name, hit):
+        counts = self.by_name.get(name)
+        if counts is None:
+            counts = self.by_name[name] = [0, 0]
+        counts[0 if hit else 1] += 1
+
+    def get(self, name, key):
+        """Return the cached fragment for (name, key), or None if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get((name, key))
+            if entry is not None:
+                expires, size, value = entry
+                if expires > now:
+                    self._data.move_to_end((name, key))
+                    self.hits += 1
+                    self._count(name, True)
+                    return value
+                del self._data[(name, key)]
+                self.bytes -= size
+            self.misses += 1
+            self._count(name, False)
+            return None
+
+    def set(self, name, key, value):
+        """Store a fragment, evicting least recently used ones until the total fits max_bytes"""
+        size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop((name, key), None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[(name, key)] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self.bytes -= evicted
+
+    def configure(self, max_bytes, ttl):
+        """Apply new limits, evicting the least recently used fragments beyond max_bytes"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self.ttl = ttl
+            while self.bytes > self.max_bytes:
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self.bytes -= evicted
+
+    def clear(self):
+        """Drop every fragment"""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return hit/miss counters, size and per-fragment hit rates"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._data),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'fragments': {name: {'hits': hits, 'misses': misses,
+                                     'hit_rate': hits / (hits + misses)}
+                              for name, (hits, misses) in sorted(self.by_name.items())},
+            }
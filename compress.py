@@ -0,0 +1,82 @@
+"""
+gzip response compression as WSGI middleware.
+Text-like responses (HTML, JSON, NDJSON, CSS, JS, CSV) are compressed when the
+client accepts gzip and the body is at least GZIP_MIN_SIZE bytes. Streamed
+responses have no Content-Length; they are compressed chunk by chunk with a sync
+flush after each one, so clients still receive every batch as it is produced.
+Responses that already carry a Content-Encoding (e.g. pre-compressed assets) pass through.
+"""
+
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_set_header
+from werkzeug.wsgi import ClosingIterator
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+# Statuses without a body, or with a byte range of the uncompressed body
+SKIP_STATUSES = (204, 206, 304)
+
+
+def _compressible(headers):
+    content_type = headers.get('Content-Type', '')
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _compress(body, compressor, flush):
+    for chunk in body:
+        data = compressor.compress(chunk)
+        if flush:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class GzipMiddleware:
+    """Wraps a WSGI app; settings are read from config (GZIP_ENABLED, GZIP_MIN_SIZE, GZIP_LEVEL) per request"""
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+
+    def __call__(self, environ, start_response):
+        if (not self.config.get('GZIP_ENABLED', True) or environ.get('REQUEST_METHOD') == 'HEAD'
+                or not parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))['gzip']):
+            return self.wsgi_app(environ, start_response)
+
+        min_size = self.config.get('GZIP_MIN_SIZE', 1024)
+        state = {}
+
+        def gzip_start_response(status, headers, exc_info=None):
+            headers = Headers(headers)
+            if _compressible(headers):
+                vary = parse_set_header(headers.get('Vary'))
+                vary.add('Accept-Encoding')
+                headers['Vary'] = vary.to_header()
+                length = headers.get('Content-Length', type=int)
+                if (int(status.split(' ', 1)[0]) not in SKIP_STATUSES
+                        and 'Content-Encoding' not in headers
+                        and 'no-transform' not in headers.get('Cache-Control', '')
+                        and (length is None or length >= min_size)):
+                    state['compressor'] = zlib.compressobj(self.config.get('GZIP_LEVEL', 6), zlib.DEFLATED, 31)
+                    state['flush'] = length is None
+                    headers.remove('Content-Length')
+                    headers['Content-Encoding'] = 'gzip'
+                    # The compressed body is a different representation of the same content
+                    etag = headers.get('ETag')
+                    if etag and not etag.startswith('W/'):
+                        headers['ETag'] = 'W/' + etag
+            return start_response(status, headers.to_wsgi_list(), exc_info)
+
+        body = self.wsgi_app(environ, gzip_start_response)
+        if 'compressor' not in state:
+            return body
+        # Closing the compressed stream still closes the app's response (teardown, pooled connections)
+        return ClosingIterator(_compress(body, state['compressor'], state['flush']), getattr(body, 'close', None))
+
+
+def init_app(app):
+    """Compress app's responses according to its GZIP_* settings"""
+    app.wsgi_app = GzipMiddleware(app.wsgi_app, app.config)
@@ -0,0 +1,397 @@
+"""
+Database connection management for the Hospital Management System.
+Connections are opened lazily once per request and returned to a bounded pool on teardown.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from flask import current_app, g
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks become no-ops
+    fcntl = None
+
+
+# Default tuning values, overridable through app.config
+DEFAULT_CONFIG = {
+    'DB_POOL_SIZE': 8,
+    'DB_BUSY_TIMEOUT_MS': 5000,
+    'DB_SYNCHRONOUS': 'NORMAL',
+    'DB_MMAP_SIZE': 64 * 1024 * 1024,
+    'DB_CACHE_SIZE_KB': 16 * 1024,
+    # Per-connection cache of compiled statements, reused by the fixed repository queries
+    'DB_CACHED_STATEMENTS': 256,
+}
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections configured with WAL and tuned pragmas"""
+
+    def __init__(self, database, size=8, busy_timeout_ms=5000, synchronous='NORMAL',
+                 mmap_size=0, cache_size_kb=2000, cached_statements=128, attach=None):
+        self.database = database
+        self.attach = dict(attach or {})
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+        # SQLite connections must not cross a fork; get_pool() builds a new pool in each process
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, timeout=self.busy_timeout_ms / 1000.0,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        # Negative cache_size is interpreted by SQLite as KiB rather than pages
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+        for alias, path in self.attach.items():
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+        return conn
+
+    def acquire(self):
+        """Return an idle connection, or open a new one if the pool is empty"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        """Hand a connection back to the pool, closing it if the pool is full"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._idle.put_nowait(conn)
+                    return
+                except queue.Full:
+                    pass
+        conn.close()
+
+    def close(self):
+        """Close every idle connection and stop accepting returned ones"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def archive_database(config):
+    """Path of the archive database (see archive.py): ARCHIVE_DATABASE, or <DATABASE>_archive.db"""
+    return config.get('ARCHIVE_DATABASE') or os.path.splitext(config['DATABASE'])[0] + '_archive.db'
+
+
+def get_pool(app=None):
+    """Return the connection pool bound to the given (or current) app"""
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('db_pool')
+    attach = {'archive': archive_database(app.config)}
+    if (pool is None or pool.pid != os.getpid()
+            or pool.database != app.config['DATABASE'] or pool.attach != attach):
+        # A pool inherited from the parent process is dropped, not closed: its connections belong to the parent
+        if pool is not None and pool.pid == os.getpid():
+            pool.close()
+        config = {key: app.config.get(key, value) for key, value in DEFAULT_CONFIG.items()}
+        pool = ConnectionPool(app.config['DATABASE'],
+                              size=config['DB_POOL_SIZE'],
+                              busy_timeout_ms=config['DB_BUSY_TIMEOUT_MS'],
+                              synchronous=config['DB_SYNCHRONOUS'],
+                              mmap_size=config['DB_MMAP_SIZE'],
+                              cache_size_kb=config['DB_CACHE_SIZE_KB'],
+                              cached_statements=config['DB_CACHED_STATEMENTS'],
+                              attach=attach)
+        app.extensions['db_pool'] = pool
+    return pool
+
+
+def get_db():
+    """Return the connection for the current app context, opening it on first use"""
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+
+def close_db(exception=None):
+    """Return the app context's connection to the pool"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+@contextmanager
+def connection(pool=None):
+    """Borrow a pooled connection outside the app context lifecycle (e.g. streaming responses)"""
+    pool = pool or get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+class FileLock:
+    """Exclusive inter-process lock held on a lock file (flock); a no-op without fcntl"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        """Take the lock; with blocking=False return False instead of waiting for it"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def init_app(app):
+    """Register the pool teardown with the Flask app"""
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.teardown_appcontext(close_db)
+
+
+# Schema migrations, applied in order on top of the base tables created by init_db().
+# Each entry upgrades the database to the version at the same position (1-based);
+# PRAGMA user_version records the last applied step.
+def _create_patient_search_index(conn):
+    # External-content FTS5 index over patients, kept in sync by triggers.
+    # Builds without FTS5 skip it and search.py falls back to LIKE scans.
+    try:
+        conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+            name, phone, email,
+            content='patients', content_rowid='id',
+            tokenize='unicode61', prefix='2 3'
+        )""")
+    except sqlite3.OperationalError:
+        return
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO patients_fts (rowid, name, phone, email) VALUES (new.id, new.name, new.phone, new.email);
+    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN
+        INSERT INTO patients_fts (patients_fts, rowid, name, phone, email)
+        VALUES ('delete', old.id, old.name, old.phone, old.email);
+    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS patients_fts_au AFTER UPDATE OF name, phone, email ON patients BEGIN
+        INSERT INTO patients_fts (patients_fts, rowid, name, phone, email)
+        VALUES ('delete', old.id, old.name, old.phone, old.email);
+        INSERT INTO patients_fts (rowid, name, phone, email) VALUES (new.id, new.name, new.phone, new.email);
+    END""")
+    conn.execute("INSERT INTO patients_fts (patients_fts) VALUES ('rebuild')")
+
+
+MIGRATIONS = [
+    # 1: secondary indexes for the dashboard, booking and history access paths
+    [
+        "CREATE INDEX IF NOT EXISTS idx_appointments_doctor_date_time ON appointments (doctor_id, date, time)",
+        "CREATE INDEX IF NOT EXISTS idx_appointments_patient_date ON appointments (patient_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_availability_doctor_date ON doctor_availability (doctor_id, date, start_time)",
+        "CREATE INDEX IF NOT EXISTS idx_treatments_appointment ON treatments (appointment_id)",
+        "CREATE INDEX IF NOT EXISTS idx_doctors_department ON doctors (department_id)",
+    ],
+    # 2: sort-order indexes backing keyset pagination on (date, time, id) and (name, id)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_appointments_date_time ON appointments (date, time)",
+        "CREATE INDEX IF NOT EXISTS idx_patients_active_name ON patients (is_active, name)",
+    ],
+    # 3: full-text index for admin patient search
+    [
+        _create_patient_search_index,
+    ],
+    # 4: trigger-maintained counters for the admin dashboard and departments.doctors_count
+    [
+        """CREATE TABLE IF NOT EXISTS stats (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS stats_doctors_ai AFTER INSERT ON doctors BEGIN
+            INSERT INTO stats (key, value) VALUES ('doctors_active', new.is_active = 1)
+            ON CONFLICT (key) DO UPDATE SET value = value + excluded.value;
+            UPDATE departments SET doctors_count = doctors_count + 1
+            WHERE id = new.department_id AND new.is_active = 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_doctors_ad AFTER DELETE ON doctors BEGIN
+            UPDATE stats SET value = value - 1 WHERE key = 'doctors_active' AND old.is_active = 1;
+            UPDATE departments SET doctors_count = doctors_count - 1
+            WHERE id = old.department_id AND old.is_active = 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_doctors_au AFTER UPDATE OF is_active, department_id ON doctors BEGIN
+            UPDATE stats SET value = value + (new.is_active = 1) - (old.is_active = 1) WHERE key = 'doctors_active';
+            UPDATE departments SET doctors_count = doctors_count - 1
+            WHERE id = old.department_id AND old.is_active = 1;
+            UPDATE departments SET doctors_count = doctors_count + 1
+            WHERE id = new.department_id AND new.is_active = 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_patients_ai AFTER INSERT ON patients BEGIN
+            INSERT INTO stats (key, value) VALUES ('patients_active', new.is_active = 1)
+            ON CONFLICT (key) DO UPDATE SET value = value + excluded.value;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_patients_ad AFTER DELETE ON patients BEGIN
+            UPDATE stats SET value = value - 1 WHERE key = 'patients_active' AND old.is_active = 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_patients_au AFTER UPDATE OF is_active ON patients BEGIN
+            UPDATE stats SET value = value + (new.is_active = 1) - (old.is_active = 1) WHERE key = 'patients_active';
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_appointments_ai AFTER INSERT ON appointments BEGIN
+            INSERT INTO stats (key, value) VALUES ('appointments:' || new.status, 1)
+            ON CONFLICT (key) DO UPDATE SET value = value + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_appointments_ad AFTER DELETE ON appointments BEGIN
+            UPDATE stats SET value = value - 1 WHERE key = 'appointments:' || old.status;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_appointments_au AFTER UPDATE OF status ON appointments
+        WHEN new.status IS NOT old.status BEGIN
+            UPDATE stats SET value = value - 1 WHERE key = 'appointments:' || old.status;
+            INSERT INTO stats (key, value) VALUES ('appointments:' || new.status, 1)
+            ON CONFLICT (key) DO UPDATE SET value = value + 1;
+        END""",
+        # Backfill from the current data, which also corrects any drift in doctors_count
+        "DELETE FROM stats",
+        "INSERT INTO stats (key, value) SELECT 'doctors_active', COUNT(*) FROM doctors WHERE is_active = 1",
+        "INSERT INTO stats (key, value) SELECT 'patients_active', COUNT(*) FROM patients WHERE is_active = 1",
+        """INSERT INTO stats (key, value)
+           SELECT 'appointments:' || status, COUNT(*) FROM appointments WHERE status IS NOT NULL GROUP BY status""",
+        """UPDATE departments SET doctors_count = (
+               SELECT COUNT(*) FROM doctors d WHERE d.department_id = departments.id AND d.is_active = 1)""",
+        "CREATE INDEX IF NOT EXISTS idx_appointments_created ON appointments (created_at)",
+    ],
+    # 5: at most one active (non-cancelled) appointment per doctor slot.
+    # Double bookings left behind by the old check-then-insert path keep their
+    # earliest appointment; later duplicates are cancelled so the index can be built.
+    [
+        """UPDATE appointments SET status = 'Cancelled'
+           WHERE status != 'Cancelled' AND EXISTS (
+               SELECT 1 FROM appointments b
+               WHERE b.doctor_id = appointments.doctor_id AND b.date = appointments.date
+                 AND b.time = appointments.time AND b.status != 'Cancelled' AND b.id < appointments.id)""",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_appointments_active_slot
+           ON appointments (doctor_id, date, time) WHERE status != 'Cancelled'""",
+    ],
+    # 6: recurring weekly availability rules and per-date exceptions (see availability.py)
+    [
+        """CREATE TABLE IF NOT EXISTS availability_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doctor_id INTEGER NOT NULL,
+            weekdays INTEGER NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            valid_from TEXT NOT NULL,
+            valid_until TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (doctor_id) REFERENCES doctors(id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_availability_rules_doctor ON availability_rules (doctor_id, valid_from)",
+        """CREATE TABLE IF NOT EXISTS availability_exceptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doctor_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            reason TEXT,
+            UNIQUE (doctor_id, date),
+            FOREIGN KEY (doctor_id) REFERENCES doctors(id)
+        )""",
+    ],
+    # 7: background jobs (see jobs.py): reminder outbox, and indexes that keep the
+    # sweeps from scanning appointment history or every availability row
+    [
+        """CREATE TABLE IF NOT EXISTS reminder_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            appointment_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            recipient TEXT,
+            message TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Pending',
+            send_after TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP,
+            UNIQUE (appointment_id, kind),
+            FOREIGN KEY (appointment_id) REFERENCES appointments(id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_reminder_outbox_pending ON reminder_outbox (status, send_after)",
+        "CREATE INDEX IF NOT EXISTS idx_appointments_booked_date ON appointments (date, time) WHERE status = 'Booked'",
+        "CREATE INDEX IF NOT EXISTS idx_availability_date ON doctor_availability (date)",
+    ],
+]
+
+
+def read_stats(conn):
+    """Return the trigger-maintained counters as active doctor/patient totals and appointments by status"""
+    stats = {'doctors_active': 0, 'patients_active': 0, 'appointments': {}}
+    for key, value in conn.execute("SELECT key, value FROM stats"):
+        if key.startswith('appointments:'):
+            if value:
+                stats['appointments'][key.split(':', 1)[1]] = value
+        else:
+            stats[key] = value
+    return stats
+
+
+def schema_version(conn):
+    """Return the schema version stored in the database header"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def is_current(database):
+    """Return True if the database file exists and has every migration applied"""
+    if not os.path.exists(database):
+        return False
+    conn = sqlite3.connect(database)
+    try:
+        return schema_version(conn) >= len(MIGRATIONS)
+    finally:
+        conn.close()
+
+
+def migrate(conn):
+    """Apply pending migrations in place and return the resulting schema version"""
+    version = schema_version(conn)
+    for target, statements in enumerate(MIGRATIONS, start=1):
+        if target <= version:
+            continue
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+    return version
@@ -0,0 +1,139 @@
+"""
+Process-local, versioned cache of departments and active doctors.
+Lookups and searches are served from memory; the write paths in app.py call
+invalidate() so the next reader reloads a fresh snapshot from the database.
+"""
+
+import bisect
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from repository import DEPARTMENT_COLUMNS, DOCTOR_COLUMNS
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _words(text):
+    return [word.lower() for word in _WORD_RE.findall(text or '')]
+
+
+class _PrefixIndex:
+    """Sorted (word, doctor_id) pairs answering word-prefix lookups with bisect"""
+
+    def __init__(self, entries):
+        self._entries = sorted(set(entries))
+        self._words = [word for word, _ in self._entries]
+
+    def lookup(self, prefix):
+        """Return ids of doctors having a word that starts with prefix"""
+        start = bisect.bisect_left(self._words, prefix)
+        end = bisect.bisect_left(self._words, prefix + '\U0010ffff', lo=start)
+        return {doctor_id for _, doctor_id in self._entries[start:end]}
+
+
+class _Snapshot:
+    """Immutable view of the directory at one version"""
+
+    def __init__(self, version, departments, doctors, previous=None):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.departments = departments
+        self.doctors = doctors
+        # Content hash used as the HTTP validator; identical data gives the same ETag in every process
+        content = json.dumps([departments, doctors], sort_keys=True, default=str).encode()
+        self.etag = hashlib.sha1(content).hexdigest()[:20]
+        if previous is not None and previous.etag == self.etag:
+            self.modified_at = previous.modified_at
+        else:
+            self.modified_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self.departments_by_id = {dept['id']: dept for dept in departments}
+        self.doctors_by_id = {doctor['id']: doctor for doctor in doctors}
+        self.name_index = _PrefixIndex(
+            (word, doctor['id']) for doctor in doctors for word in _words(doctor['name']))
+        self.specialization_index = _PrefixIndex(
+            (word, doctor['id']) for doctor in doctors
+            for word in _words(doctor['specialization']) + _words(doctor['department_name']))
+
+
+class DoctorDirectory:
+    """Versioned in-memory directory of departments and active doctors"""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.version = 1
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Bump the version so the next read reloads from the database"""
+        with self._lock:
+            self.version += 1
+
+    def current(self):
+        """Return the current snapshot if it is still fresh, without touching the database"""
+        snapshot = self._snapshot
+        if (snapshot is not None and snapshot.version == self.version
+                and time.monotonic() - snapshot.loaded_at < self.ttl):
+            return snapshot
+        return None
+
+    def snapshot(self, conn):
+        """Return the current snapshot, reloading it if stale or expired"""
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if (snapshot is None or snapshot.version != self.version
+                    or time.monotonic() - snapshot.loaded_at >= self.ttl):
+                snapshot = self._load(conn, self.version, snapshot)
+                self._snapshot = snapshot
+            return snapshot
+
+    def _load(self, conn, version, previous=None):
+        departments = [dict(row) for row in conn.execute(
+            f"SELECT {DEPARTMENT_COLUMNS} FROM departments dep ORDER BY dep.name")]
+        doctors = [dict(row) for row in conn.execute(f"""
+            SELECT {DOCTOR_COLUMNS}, dep.name AS department_name
+            FROM doctors d
+            LEFT JOIN departments dep ON d.department_id = dep.id
+            WHERE d.is_active = 1
+            ORDER BY d.name, d.id
+        """)]
+        return _Snapshot(version, departments, doctors, previous)
+
+    def departments(self, conn):
+        """Return all departments ordered by name"""
+        return self.snapshot(conn).departments
+
+    def department(self, conn, department_id):
+        """Return a department by id, or None"""
+        return self.snapshot(conn).departments_by_id.get(department_id)
+
+    def doctors(self, conn):
+        """Return all active doctors ordered by name"""
+        return self.snapshot(conn).doctors
+
+    def doctor(self, conn, doctor_id):
+        """Return an active doctor by id, or None"""
+        return self.snapshot(conn).doctors_by_id.get(doctor_id)
+
+    def search(self, conn, name='', specialization=''):
+        """
+        Return active doctors ordered by name whose name words start with every word
+        of name, and whose specialization or department words start with every word
+        of specialization.
+        """
+        snapshot = self.snapshot(conn)
+        matches = None
+        for index, text in ((snapshot.name_index, name), (snapshot.specialization_index, specialization)):
+            for word in _words(text):
+                ids = index.lookup(word)
+                matches = ids if matches is None else matches & ids
+        if matches is None:
+            return snapshot.doctors
+        return [doctor for doctor in snapshot.doctors if doctor['id'] in matches]
@@ -0,0 +1,151 @@
+"""
+Streaming export of appointments for reporting.
+Appointments in a date range (archived ones included) are joined with their
+patient, doctor, department and treatment and written as CSV, or as Parquet when
+pyarrow is installed. Rows are read with fetchmany() and written chunk by chunk,
+so memory use does not grow with the size of the range.
+"""
+
+import csv
+import io
+from itertools import chain
+
+import archive
+import db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV only
+    pa = pq = None
+
+EXPORT_SQL = archive.union_archive("""
+    SELECT a.id AS appointment_id, a.date, a.time, a.status, a.reason, a.created_at,
+           a.patient_id, p.name AS patient_name,
+           -- age is free text in old rows; only whole numbers are exported
+           CASE WHEN typeof(p.age) = 'integer' THEN p.age END AS age,
+           p.gender, p.blood_group,
+           a.doctor_id, d.name AS doctor_name, d.specialization, dep.name AS department,
+           t.diagnosis, t.prescription, t.notes
+    FROM {appointments} a
+    LEFT JOIN patients p ON a.patient_id = p.id
+    LEFT JOIN doctors d ON a.doctor_id = d.id
+    LEFT JOIN departments dep ON d.department_id = dep.id
+    LEFT JOIN {db}.treatments t ON a.id = t.appointment_id
+    WHERE a.date >= ? AND a.date <= ?
+""") + " ORDER BY date, time, appointment_id"
+
+# Column name and Parquet type, in EXPORT_SQL order
+COLUMNS = [
+    ('appointment_id', 'int64'), ('date', 'string'), ('time', 'string'), ('status', 'string'),
+    ('reason', 'string'), ('created_at', 'string'), ('patient_id', 'int64'), ('patient_name', 'string'),
+    ('age', 'int64'), ('gender', 'string'), ('blood_group', 'string'), ('doctor_id', 'int64'),
+    ('doctor_name', 'string'), ('specialization', 'string'), ('department', 'string'),
+    ('diagnosis', 'string'), ('prescription', 'string'), ('notes', 'string'),
+]
+
+MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def formats():
+    """Export formats available in this installation"""
+    return ['csv', 'parquet'] if pq is not None else ['csv']
+
+
+def fetch_batches(conn, date_from, date_to, batch_size=1000):
+    """Yield the export rows between two dates inclusive, one fetchmany() batch at a time"""
+    cursor = conn.execute(EXPORT_SQL, (date_from, date_to) * 2)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def iter_csv(batches):
+    """Yield CSV text: the header, then one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(name for name, _ in COLUMNS)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _Sink:
+    """Write-only file object collecting what the Parquet writer produces until it is taken"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _table(schema, batches):
+    columns = list(zip(*chain.from_iterable(batches)))
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                schema=schema)
+
+
+def iter_parquet(batches, row_group_size=16384):
+    """Yield a Parquet file in pieces, one row group (of about row_group_size rows) at a time"""
+    if pq is None:
+        raise RuntimeError('Parquet export requires pyarrow')
+    schema = pa.schema([(name, type_name) for name, type_name in COLUMNS])
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    pending, count = [], 0
+    for rows in batches:
+        pending.append(rows)
+        count += len(rows)
+        if count >= row_group_size:
+            writer.write_table(_table(schema, pending))
+            pending, count = [], 0
+            yield sink.take()
+    if pending:
+        writer.write_table(_table(schema, pending))
+    writer.close()
+    yield sink.take()
+
+
+def export(conn, fmt, date_from, date_to, batch_size=1000):
+    """Yield the export between two dates inclusive as CSV text chunks or Parquet byte chunks"""
+    batches = fetch_batches(conn, date_from, date_to, batch_size)
+    return iter_parquet(batches) if fmt == 'parquet' else iter_csv(batches)
+
+
+def generate(pool, fmt, date_from, date_to, batch_size=1000):
+    """Like export(), on a connection borrowed from pool for as long as the response streams"""
+    with db.connection(pool) as conn:
+        yield from export(conn, fmt, date_from, date_to, batch_size)
@@ -0,0 +1,72 @@
+"""
+Rendered template fragment cache.
+Expensive list sections of templates are wrapped in
+
+    {% cache 'name', ['table', ...], vary... %} ... {% endcache %}
+
+and their rendered HTML is reused while the listed tables' version counters and
+the vary values stay the same. Write paths in app.py bump the counters of the
+tables they change, so stale fragments are never served by this process; the
+cache TTL bounds staleness caused by other worker processes.
+"""
+
+import threading
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class TableVersions:
+    """Per-table version counters, bumped whenever a table is written"""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, *tables):
+        """Return the current versions of tables as a tuple"""
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja extension adding the {% cache name, tables, vary... %} block"""
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, table_versions=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        if len(args) < 2:
+            parser.fail('cache requires a fragment name and a list of tables', lineno)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        name, tables, vary = args[0], args[1], args[2:]
+        key = (self.environment.table_versions.get(*tables), tuple(str(value) for value in vary))
+        value = cache.get(name, key)
+        if value is None:
+            value = str(caller())
+            cache.set(name, key, value)
+        return Markup(value)
+
+
+def init_app(app, cache, versions):
+    """Enable {% cache %} in app's templates, backed by cache and versions"""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = cache
+    app.jinja_env.table_versions = versions
@@ -0,0 +1,237 @@
+"""
+Bulk import of doctors, patients and availability from CSV or JSONL files.
+Rows are streamed from the file, validated, and written with executemany() in
+large batches inside a single transaction per file.
+"""
+
+import csv
+import json
+import re
+import time
+from itertools import islice
+
+from booking import is_date, is_time
+
+PHONE_RE = re.compile(r'^\d{10}$')
+
+
+class RowError(ValueError):
+    """A row that failed validation"""
+
+
+def read_rows(path, fmt=None):
+    """
+    Yield (line_number, dict) pairs from a CSV or JSONL file without loading it whole.
+    A JSONL line that is not a JSON object is yielded as (line_number, RowError).
+    """
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                yield line, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        else:
+            for line, text in enumerate(f, start=1):
+                if text.strip():
+                    try:
+                        row = json.loads(text)
+                    except ValueError as e:
+                        yield line, RowError(f'invalid JSON: {e}')
+                        continue
+                    if not isinstance(row, dict):
+                        yield line, RowError('each line must be a JSON object')
+                        continue
+                    yield line, {key: '' if value is None else str(value).strip() for key, value in row.items()}
+
+
+def _required(row, *fields):
+    for field in fields:
+        if not row.get(field):
+            raise RowError(f'{field} is required')
+
+
+def _phone(row):
+    phone = row.get('phone', '')
+    if phone and not PHONE_RE.match(phone):
+        raise RowError('Phone Number should be 10 digits')
+    return phone or None
+
+
+def _int(row, field):
+    value = row.get(field, '')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f'{field} must be a whole number')
+
+
+def _date(row, field):
+    value = row.get(field, '')
+    if not is_date(value):
+        raise RowError(f'{field} must be a date in YYYY-MM-DD format')
+    return value
+
+
+def _time(row, field):
+    value = row.get(field, '')
+    if not is_time(value):
+        raise RowError(f'{field} must be a time in HH:MM format')
+    return value
+
+
+class _UserImport:
+    """Shared handling for entities that own a users row (doctors and patients)"""
+
+    role = None
+    profile_sql = None
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.seen = set()
+
+    def validate(self, row):
+        _required(row, 'username', 'password', 'name')
+        if row['username'] in self.seen:
+            raise RowError(f"duplicate username {row['username']!r} in file")
+        self.seen.add(row['username'])
+        return self.profile(row)
+
+    def existing_usernames(self, usernames):
+        placeholders = ', '.join('?' for _ in usernames)
+        return {r[0] for r in self.conn.execute(
+            f"SELECT username FROM users WHERE username IN ({placeholders})", usernames)}
+
+    def write(self, batch):
+        """Insert users then profiles for a validated batch; return rows rejected as existing"""
+        taken = self.existing_usernames([row['username'] for row, _ in batch])
+        rejected = [(row, 'username already exists') for row, _ in batch if row['username'] in taken]
+        batch = [(row, profile) for row, profile in batch if row['username'] not in taken]
+        self.conn.executemany("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                              [(row['username'], row['password'], self.role) for row, _ in batch])
+        # The profile rows pick up their user id with a lookup on the unique username index
+        self.conn.executemany(self.profile_sql, [profile + (row['username'],) for row, profile in batch])
+        return rejected
+
+
+class DoctorImport(_UserImport):
+    role = 'doctor'
+    profile_sql = """INSERT INTO doctors (user_id, name, specialization, department_id, phone, email, experience)
+                     SELECT id, ?, ?, ?, ?, ?, ? FROM users WHERE username = ?"""
+
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.departments = {name.lower(): dept_id for dept_id, name in
+                            conn.execute("SELECT id, name FROM departments")}
+        self.department_ids = set(self.departments.values())
+
+    def profile(self, row):
+        _required(row, 'specialization')
+        department_id = _int(row, 'department_id')
+        if department_id is None and row.get('department'):
+            department_id = self.departments.get(row['department'].lower())
+            if department_id is None:
+                raise RowError(f"unknown department {row['department']!r}")
+        if department_id is not None and department_id not in self.department_ids:
+            raise RowError(f'unknown department id {department_id}')
+        return (row['name'], row['specialization'], department_id, _phone(row),
+                row.get('email') or None, _int(row, 'experience'))
+
+
+class PatientImport(_UserImport):
+    role = 'patient'
+    profile_sql = """INSERT INTO patients (user_id, name, age, gender, phone, email, address, blood_group)
+                     SELECT id, ?, ?, ?, ?, ?, ?, ? FROM users WHERE username = ?"""
+
+    def profile(self, row):
+        return (row['name'], _int(row, 'age'), row.get('gender') or None, _phone(row),
+                row.get('email') or None, row.get('address') or None, row.get('blood_group') or None)
+
+
+class AvailabilityImport:
+    """Availability rows, addressed by doctor_id or doctor_username"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.doctor_ids = {r[0] for r in conn.execute("SELECT id FROM doctors WHERE is_active = 1")}
+        self.doctors_by_username = dict(conn.execute("""
+            SELECT u.username, d.id FROM doctors d JOIN users u ON d.user_id = u.id WHERE d.is_active = 1
+        """))
+
+    def validate(self, row):
+        doctor_id = _int(row, 'doctor_id')
+        if doctor_id is None:
+            _required(row, 'doctor_username')
+            doctor_id = self.doctors_by_username.get(row['doctor_username'])
+            if doctor_id is None:
+                raise RowError(f"unknown doctor {row['doctor_username']!r}")
+        elif doctor_id not in self.doctor_ids:
+            raise RowError(f'unknown doctor id {doctor_id}')
+        start_time, end_time = _time(row, 'start_time'), _time(row, 'end_time')
+        if start_time >= end_time:
+            raise RowError('start_time must be before end_time')
+        return (doctor_id, _date(row, 'date'), start_time, end_time)
+
+    def write(self, batch):
+        self.conn.executemany("""INSERT INTO doctor_availability (doctor_id, date, start_time, end_time)
+                                 VALUES (?, ?, ?, ?)""", [values for _, values in batch])
+        return []
+
+
+IMPORTERS = {
+    'doctors': DoctorImport,
+    'patients': PatientImport,
+    'availability': AvailabilityImport,
+}
+
+
+def import_file(conn, kind, path, fmt=None, batch_size=5000, strict=False):
+    """
+    Import one file and return a report dict.
+
+    Invalid rows are skipped and listed in the report; with strict=True the first
+    invalid row aborts the import and nothing is written.
+    """
+    importer = IMPORTERS[kind](conn)
+    errors = []
+    imported = 0
+    started = time.perf_counter()
+    rows = read_rows(path, fmt)
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            batch = []
+            for line, row in chunk:
+                try:
+                    if isinstance(row, RowError):
+                        raise row
+                    batch.append((row, importer.validate(row)))
+                except RowError as e:
+                    if strict:
+                        raise RowError(f'line {line}: {e}')
+                    errors.append((line, str(e)))
+            rejected = importer.write(batch)
+            if rejected and strict:
+                raise RowError(f'{rejected[0][0].get("username")}: {rejected[0][1]}')
+            errors.extend((row.get('username'), reason) for row, reason in rejected)
+            imported += len(batch) - len(rejected)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    elapsed = time.perf_counter() - started
+    return {
+        'kind': kind,
+        'imported': imported,
+        'skipped': len(errors),
+        'errors': errors,
+        'seconds': elapsed,
+        'rows_per_second': imported / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,201 @@
+"""
+Background housekeeping jobs.
+A single daemon thread, started with the app, runs each registered job on its own
+interval with a pooled connection; with several worker processes only one of them
+(the holder of a lock file next to the database) runs the jobs. Jobs work in small batches, each in its own
+short write transaction, so request handlers never wait on them for long.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import db
+
+logger = logging.getLogger('hms.jobs')
+
+
+def _run_batches(conn, sql, params, batch_size, max_batches):
+    """Run a batched write statement (ending in LIMIT ?) until it changes fewer rows than batch_size"""
+    total = 0
+    for _ in range(max_batches):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            changed = conn.execute(sql, (*params, batch_size)).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        total += changed
+        if changed < batch_size:
+            break
+    return total
+
+
+def mark_no_shows(conn, grace_days=1, today=None, batch_size=500, max_batches=100):
+    """
+    Mark appointments still 'Booked' more than grace_days after their date as 'No-Show';
+    until then doctors can still complete them (e.g. yesterday's, the next morning)
+    """
+    today = datetime.strptime(today, '%Y-%m-%d').date() if today else datetime.now().date()
+    cutoff = str(today - timedelta(days=grace_days))
+    return _run_batches(conn, """
+        UPDATE appointments SET status = 'No-Show'
+        WHERE id IN (SELECT id FROM appointments WHERE status = 'Booked' AND date < ? LIMIT ?)
+    """, (cutoff,), batch_size, max_batches)
+
+
+def expire_availability(conn, retention_days=30, today=None, batch_size=500, max_batches=100):
+    """Delete one-off availability windows and days off older than retention_days"""
+    today = datetime.strptime(today, '%Y-%m-%d').date() if today else datetime.now().date()
+    cutoff = str(today - timedelta(days=retention_days))
+    expired = _run_batches(conn, """
+        DELETE FROM doctor_availability
+        WHERE id IN (SELECT id FROM doctor_availability WHERE date < ? LIMIT ?)
+    """, (cutoff,), batch_size, max_batches)
+    expired += _run_batches(conn, """
+        DELETE FROM availability_exceptions
+        WHERE id IN (SELECT id FROM availability_exceptions WHERE date < ? LIMIT ?)
+    """, (cutoff,), batch_size, max_batches)
+    return expired
+
+
+def queue_reminders(conn, lead_hours=24, now=None, batch_size=500, max_batches=100):
+    """Queue a reminder in reminder_outbox for each booked appointment starting within lead_hours"""
+    now = now or datetime.now()
+    start = now.strftime('%Y-%m-%d %H:%M')
+    end = (now + timedelta(hours=lead_hours)).strftime('%Y-%m-%d %H:%M')
+    return _run_batches(conn, """
+        INSERT OR IGNORE INTO reminder_outbox (appointment_id, kind, recipient, message, send_after)
+        SELECT a.id, 'upcoming', COALESCE(p.email, p.phone),
+               'Reminder: appointment with Dr. ' || d.name || ' on ' || a.date || ' at ' || a.time,
+               ?
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        JOIN doctors d ON a.doctor_id = d.id
+        WHERE a.status = 'Booked' AND a.date BETWEEN ? AND ?
+          AND a.date || ' ' || a.time BETWEEN ? AND ?
+          AND NOT EXISTS (SELECT 1 FROM reminder_outbox r WHERE r.appointment_id = a.id AND r.kind = 'upcoming')
+        LIMIT ?
+    """, (start, start[:10], end[:10], start, end), batch_size, max_batches)
+
+
+class Job:
+    """A registered job and its run statistics"""
+    __slots__ = ('name', 'func', 'interval', 'tables', 'kwargs', 'next_run',
+                 'runs', 'errors', 'last_run', 'last_seconds', 'last_result')
+
+    def __init__(self, name, func, interval, tables, kwargs):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.tables = tables
+        self.kwargs = kwargs
+        self.next_run = 0.0
+        self.runs = 0
+        self.errors = 0
+        self.last_run = None
+        self.last_seconds = None
+        self.last_result = None
+
+
+class Scheduler:
+    """Runs registered jobs periodically on one daemon thread"""
+
+    def __init__(self, app, on_change=None, leader_retry=60.0):
+        self.app = app
+        self.on_change = on_change
+        self.leader_retry = leader_retry
+        self.jobs = {}
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    def add(self, name, func, interval, tables=(), **kwargs):
+        """Register func(conn, **kwargs) to run every interval seconds; tables are passed to on_change"""
+        self.jobs[name] = Job(name, func, interval, tables, kwargs)
+
+    def run(self, name):
+        """Run one job now on a pooled connection and return its result"""
+        job = self.jobs[name]
+        started = time.perf_counter()
+        try:
+            with db.connection(db.get_pool(self.app)) as conn:
+                result = job.func(conn, **job.kwargs)
+        except Exception:
+            job.errors += 1
+            logger.exception('job %s failed', name)
+            result = None
+        job.runs += 1
+        job.last_run = datetime.now()
+        job.last_seconds = time.perf_counter() - started
+        job.last_result = result
+        if result and job.tables and self.on_change:
+            self.on_change(*job.tables)
+        return result
+
+    def run_pending(self):
+        """Run every job that is due and return the seconds until the next one"""
+        now = time.monotonic()
+        for job in list(self.jobs.values()):
+            if self._stopping:
+                break
+            if job.next_run <= now:
+                self.run(job.name)
+                job.next_run = time.monotonic() + job.interval
+        return max(0.0, min((job.next_run for job in self.jobs.values()), default=60.0) - time.monotonic())
+
+    def _loop(self):
+        # With several worker processes only the one holding the lock file runs the jobs;
+        # the others retry, so another worker takes over if the holder exits
+        lock = db.FileLock(self.app.config['DATABASE'] + '.jobs.lock')
+        leader = False
+        try:
+            while not self._stopping:
+                leader = leader or lock.acquire(blocking=False)
+                delay = self.run_pending() if leader else self.leader_retry
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+        finally:
+            lock.release()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the worker thread unless it is already running"""
+        with self._lock:
+            if not self.running:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._loop, name='hms-jobs', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the worker thread after its current job"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        """Return the run statistics of every job"""
+        return {job.name: {
+            'interval': job.interval,
+            'runs': job.runs,
+            'errors': job.errors,
+            'last_run': job.last_run.isoformat(timespec='seconds') if job.last_run else None,
+            'last_seconds': job.last_seconds,
+            'last_result': job.last_result,
+        } for job in self.jobs.values()}
+
+
+def init_app(app, scheduler):
+    """Start scheduler with the first request the app serves, if JOBS_ENABLED"""
+
+    @app.before_request
+    def start_jobs():
+        if app.config.get('JOBS_ENABLED') and not scheduler.running:
+            scheduler.start()
@@ -0,0 +1,300 @@
+"""
+Per-request timing and SQL instrumentation.
+The request's database connection is wrapped so every query's count, time and
+returned rows are recorded; after_request folds them together with the view
+timing into per-endpoint histograms, exposed in Prometheus text format and as a
+Server-Timing response header.
+"""
+
+import threading
+import time
+from functools import partial
+from itertools import chain
+
+from flask import g, request
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class QueryStats:
+    """SQL counters for one request"""
+    __slots__ = ('queries', 'seconds', 'rows')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that adds fetch time and fetched rows to the request's QueryStats,
+    and reports the query's execute plus fetch time once its rows are exhausted or
+    the cursor is closed (or dropped with rows left unread)
+    """
+
+    def __init__(self, cursor, stats, report=None, elapsed=0.0):
+        self._cursor = cursor
+        self._stats = stats
+        self._report = report
+        self._elapsed = elapsed
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        result = method(*args)
+        elapsed = time.perf_counter() - started
+        self._stats.seconds += elapsed
+        self._elapsed += elapsed
+        return result
+
+    def _finish(self):
+        report, self._report = self._report, None
+        if report is not None:
+            report(self._elapsed)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._timed(self._cursor.fetchmany, *args)
+        self._stats.rows += len(rows)
+        if len(rows) < (args[0] if args else self._cursor.arraysize):
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._stats.rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._cursor.close()
+        self._finish()
+
+    def __del__(self):
+        # e.g. conn.execute(...).fetchone(): the rest of the rows is never read
+        self._finish()
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection proxy recording every execute() into a QueryStats"""
+
+    def __init__(self, conn, stats, observers=()):
+        self._conn = conn
+        self.stats = stats
+        self.observers = list(observers)
+
+    def _record(self, cursor, sql, params, elapsed, many=None):
+        self.stats.queries += 1
+        self.stats.seconds += elapsed
+        report = None
+        if self.observers:
+            report = partial(self._notify, sql, params, many)
+            if cursor.description is None:
+                # No rows to fetch (INSERT, UPDATE, executemany, ...): the query is done
+                report(elapsed)
+                report = None
+        return InstrumentedCursor(cursor, self.stats, report, elapsed)
+
+    def _notify(self, sql, params, many, elapsed):
+        for observer in self.observers:
+            observer(self._conn, sql, params, elapsed, many)
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        cursor = self._conn.execute(sql, params)
+        return self._record(cursor, sql, params, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_params):
+        # Observers get the first parameter row and the number of rows (many), not the whole sequence
+        rows = iter(seq_of_params)
+        first = next(rows, None)
+        if first is not None:
+            rows = chain((first,), rows)
+        started = time.perf_counter()
+        cursor = self._conn.executemany(sql, rows)
+        elapsed = time.perf_counter() - started
+        count = len(seq_of_params) if hasattr(seq_of_params, '__len__') else max(cursor.rowcount, 0)
+        return self._record(cursor, sql, () if first is None else first, elapsed, many=count)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class _EndpointMetrics:
+    __slots__ = ('duration', 'sql_seconds', 'sql_queries', 'rows', 'statuses')
+
+    def __init__(self):
+        self.duration = Histogram(SECONDS_BUCKETS)
+        self.sql_seconds = Histogram(SECONDS_BUCKETS)
+        self.sql_queries = Histogram(QUERY_BUCKETS)
+        self.rows = 0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    """Per-endpoint request metrics plus registered cache counters"""
+
+    def __init__(self, prefix='hms'):
+        self.prefix = prefix
+        self.endpoints = {}
+        self.caches = {}
+        self.query_sources = []
+        self._lock = threading.Lock()
+
+    def register_cache(self, name, cache):
+        """Expose a cache's stats() hits/misses/size as metrics"""
+        self.caches[name] = cache
+
+    def register_queries(self, stats_func):
+        """Expose per-query call counts and time from stats_func() -> {name: {'calls', 'seconds'}}"""
+        self.query_sources.append(stats_func)
+
+    def observe(self, endpoint, status, duration, stats):
+        with self._lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self.endpoints[endpoint] = _EndpointMetrics()
+            metrics.duration.observe(duration)
+            metrics.sql_seconds.observe(stats.seconds)
+            metrics.sql_queries.observe(stats.queries)
+            metrics.rows += stats.rows
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def render(self):
+        """Return all metrics in Prometheus text exposition format"""
+        p = self.prefix
+        families = [
+            ('request_duration_seconds', 'histogram', 'Time spent handling the request', 'duration'),
+            ('request_sql_seconds', 'histogram', 'Time spent in SQL per request', 'sql_seconds'),
+            ('request_sql_queries', 'histogram', 'SQL queries executed per request', 'sql_queries'),
+        ]
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = []
+            for name, kind, help_text, attr in families:
+                lines.append(f'# HELP {p}_{name} {help_text}')
+                lines.append(f'# TYPE {p}_{name} {kind}')
+                for endpoint, metrics in endpoints:
+                    lines.extend(getattr(metrics, attr).render(f'{p}_{name}', f'endpoint="{endpoint}"'))
+            lines.append(f'# HELP {p}_request_sql_rows_total Rows returned by SQL queries')
+            lines.append(f'# TYPE {p}_request_sql_rows_total counter')
+            for endpoint, metrics in endpoints:
+                lines.append(f'{p}_request_sql_rows_total{{endpoint="{endpoint}"}} {metrics.rows}')
+            lines.append(f'# HELP {p}_requests_total Requests handled')
+            lines.append(f'# TYPE {p}_requests_total counter')
+            for endpoint, metrics in endpoints:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'{p}_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        if self.caches:
+            cache_stats = {name: cache.stats() for name, cache in sorted(self.caches.items())}
+            for field, kind in (('hits', 'counter'), ('misses', 'counter'), ('size', 'gauge')):
+                suffix = '_total' if kind == 'counter' else ''
+                lines.append(f'# TYPE {p}_cache_{field}{suffix} {kind}')
+                for name, stats in cache_stats.items():
+                    lines.append(f'{p}_cache_{field}{suffix}{{cache="{name}"}} {stats[field]}')
+            lines.append(f'# TYPE {p}_cache_hit_ratio gauge')
+            for name, stats in cache_stats.items():
+                lines.append(f'{p}_cache_hit_ratio{{cache="{name}"}} {stats["hit_rate"]:.4f}')
+            # Caches holding several kinds of entries (e.g. template fragments) also report per kind
+            for field in ('hits', 'misses'):
+                lines.append(f'# TYPE {p}_cache_entry_{field}_total counter')
+                for name, stats in cache_stats.items():
+                    for entry, counts in stats.get('fragments', {}).items():
+                        lines.append(f'{p}_cache_entry_{field}_total{{cache="{name}",entry="{entry}"}} {counts[field]}')
+
+        if self.query_sources:
+            query_stats = {}
+            for stats_func in self.query_sources:
+                query_stats.update(stats_func())
+            for field, help_text in (('calls', 'Data-access layer query calls'),
+                                     ('seconds', 'Time spent in data-access layer queries')):
+                lines.append(f'# HELP {p}_repository_{field}_total {help_text}')
+                lines.append(f'# TYPE {p}_repository_{field}_total counter')
+                for name, stats in sorted(query_stats.items()):
+                    lines.append(f'{p}_repository_{field}_total{{query="{name}"}} {stats[field]}')
+        return '\n'.join(lines) + '\n'
+
+
+def request_stats():
+    """Return the QueryStats of the current request, creating it on first use"""
+    if 'query_stats' not in g:
+        g.query_stats = QueryStats()
+    return g.query_stats
+
+
+def instrument(conn, observers=()):
+    """Wrap the app context's connection once so every query is recorded"""
+    wrapped = g.get('instrumented_db')
+    if wrapped is None or wrapped._conn is not conn:
+        wrapped = g.instrumented_db = InstrumentedConnection(conn, request_stats(), observers)
+    return wrapped
+
+
+def init_app(app, registry):
+    """Register the timing hooks that feed registry and set Server-Timing"""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        stats = request_stats()
+        registry.observe(request.endpoint or 'unmatched', response.status_code, duration, stats)
+        response.headers.add('Server-Timing', f'app;dur={duration * 1000:.2f}')
+        response.headers.add('Server-Timing', f'db;dur={stats.seconds * 1000:.2f};desc="{stats.queries} queries"')
+        return response
@@ -0,0 +1,124 @@
+"""
+Keyset (cursor-based) pagination helpers.
+Pages are fetched with a row-value comparison on the sort key instead of OFFSET,
+so every page costs the same regardless of how deep into the listing it is.
+"""
+
+import base64
+import json
+
+
+class Page:
+    """One page of rows plus opaque cursors for the neighbouring pages"""
+
+    def __init__(self, rows, next_cursor=None, prev_cursor=None):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def to_dict(self, key='items'):
+        """Return a JSON-serializable envelope for API responses"""
+        return {
+            key: [dict(row) for row in self.rows],
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+        }
+
+
+def encode_cursor(values):
+    """Encode sort key values as an opaque URL-safe token"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, length=None):
+    """
+    Decode a cursor token, returning None if it is missing or malformed: it must be
+    a list of length values (if given), each a string or number
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or (length is not None and len(values) != length):
+        return None
+    if not all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values):
+        return None
+    return values
+
+
+def page_size(args, default=50, maximum=500):
+    """Read ?limit= from request args, clamped to [1, maximum]"""
+    try:
+        size = int(args.get('limit', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def paginate(conn, select, where, params, keys, descending=False, after=None, before=None, limit=50):
+    """
+    Run a keyset-paginated query and return a Page.
+
+    select     -- SELECT ... FROM ... JOIN ... without WHERE/ORDER BY/LIMIT
+    where      -- list of SQL conditions ANDed together
+    params     -- parameters for the conditions in where
+    keys       -- list of (sql_expression, row_field) pairs forming a unique sort key
+    after      -- cursor token of the last row of the previous page (forward)
+    before     -- cursor token of the first row of the next page (backward)
+    """
+    conditions = list(where)
+    params = list(params)
+    columns = ', '.join(expr for expr, _ in keys)
+
+    after_values = decode_cursor(after, len(keys))
+    before_values = decode_cursor(before, len(keys)) if after_values is None else None
+    backward = before_values is not None
+    cursor_values = before_values if backward else after_values
+
+    if cursor_values is not None and len(cursor_values) == len(keys):
+        # Moving forward in DESC order (or backward in ASC order) walks to smaller keys
+        op = '<' if descending != backward else '>'
+        placeholders = ', '.join('?' for _ in keys)
+        conditions.append(f"({columns}) {op} ({placeholders})")
+        params.extend(cursor_values)
+    else:
+        cursor_values = None
+        backward = False
+
+    direction = 'DESC' if descending != backward else 'ASC'
+    sql = select
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(f"{expr} {direction}" for expr, _ in keys)
+    sql += " LIMIT ?"
+    params.append(limit + 1)
+
+    rows = conn.execute(sql, params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor([row[field] for _, field in keys])
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if backward:
+            next_cursor = cursor_for(rows[-1])
+            prev_cursor = cursor_for(rows[0]) if has_more else None
+        else:
+            next_cursor = cursor_for(rows[-1]) if has_more else None
+            prev_cursor = cursor_for(rows[0]) if cursor_values is not None else None
+
+    return Page(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
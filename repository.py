@@ -0,0 +1,290 @@
+"""
+Data-access layer for doctors, patients, appointments and availability.
+Each query selects an explicit column list and returns compact __slots__ row
+objects; every function is timed, so per-query cost is visible in one place
+(query_stats(), exported on /admin/metrics).
+"""
+
+import json
+import threading
+import time
+from functools import wraps
+
+import archive
+
+
+class Row:
+    """Compact row object: attributes in __slots__, also readable as row['name'] like sqlite3.Row"""
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_cursor(cls, cursor):
+        """Build one object per fetched row; columns not selected stay None"""
+        names = [column[0] for column in cursor.description]
+        rows = []
+        for values in cursor.fetchall():
+            row = cls.__new__(cls)
+            for name in cls.__slots__:
+                setattr(row, name, None)
+            for name, value in zip(names, values):
+                setattr(row, name, value)
+            rows.append(row)
+        return rows
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f'{type(self).__name__}(id={getattr(self, "id", None)!r})'
+
+
+class Doctor(Row):
+    __slots__ = ('id', 'user_id', 'name', 'specialization', 'department_id', 'phone', 'email',
+                 'experience', 'is_active')
+
+
+class Patient(Row):
+    __slots__ = ('id', 'user_id', 'name', 'age', 'gender', 'phone', 'email', 'address',
+                 'blood_group', 'is_active')
+
+
+class Appointment(Row):
+    # Own columns, then the optional joined patient/doctor/treatment columns the listings show
+    __slots__ = ('id', 'patient_id', 'doctor_id', 'date', 'time', 'status', 'reason', 'created_at',
+                 'patient_name', 'phone', 'age', 'gender', 'blood_group',
+                 'doctor_name', 'specialization', 'diagnosis', 'prescription', 'notes')
+
+
+class Availability(Row):
+    # recurring marks windows expanded from availability_rules rather than stored rows
+    __slots__ = ('id', 'doctor_id', 'date', 'start_time', 'end_time', 'is_available', 'recurring')
+
+
+def columns(alias, names):
+    """Return an explicit 'alias.col, ...' select list"""
+    return ', '.join(f'{alias}.{name}' for name in names)
+
+
+DOCTOR_COLUMNS = columns('d', Doctor.__slots__)
+PATIENT_COLUMNS = columns('p', Patient.__slots__)
+APPOINTMENT_COLUMNS = columns('a', Appointment.__slots__[:8])
+AVAILABILITY_COLUMNS = columns('v', Availability.__slots__[:6])
+DEPARTMENT_COLUMNS = columns('dep', ('id', 'name', 'description', 'doctors_count'))
+
+# Listings: SELECT ... FROM ... JOIN for pagination.paginate() (which adds WHERE,
+# ORDER BY and LIMIT) or for streaming with a WHERE and ORDER BY appended
+PATIENT_LISTING = f"SELECT {PATIENT_COLUMNS} FROM patients p"
+APPOINTMENT_LISTING = f"""
+    SELECT {APPOINTMENT_COLUMNS}, p.name AS patient_name, d.name AS doctor_name, d.specialization
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.id
+    JOIN doctors d ON a.doctor_id = d.id
+"""
+APPOINTMENT_PATIENT_LISTING = f"""
+    SELECT {APPOINTMENT_COLUMNS}, p.name AS patient_name
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.id
+"""
+# With the patient details shown on the doctor's schedule
+DOCTOR_SCHEDULE_LISTING = f"""
+    SELECT {APPOINTMENT_COLUMNS}, p.name AS patient_name, p.phone, p.age, p.gender, p.blood_group
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.id
+"""
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _timed(func):
+    """Record calls and time of a repository function under its name"""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with _stats_lock:
+                stats = _stats.get(name)
+                if stats is None:
+                    stats = _stats[name] = [0, 0.0]
+                stats[0] += 1
+                stats[1] += elapsed
+    return wrapper
+
+
+def query_stats():
+    """Return {function name: {'calls', 'seconds'}} for every repository query run so far"""
+    with _stats_lock:
+        return {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in sorted(_stats.items())}
+
+
+def _one(cls, cursor):
+    rows = cls.from_cursor(cursor)
+    return rows[0] if rows else None
+
+
+def _ids(ids):
+    return json.dumps(sorted({int(i) for i in ids}))
+
+
+# Doctors
+
+@_timed
+def doctor_by_id(conn, doctor_id):
+    return _one(Doctor, conn.execute(f"SELECT {DOCTOR_COLUMNS} FROM doctors d WHERE d.id = ?", (doctor_id,)))
+
+
+@_timed
+def doctor_by_user(conn, user_id):
+    return _one(Doctor, conn.execute(f"SELECT {DOCTOR_COLUMNS} FROM doctors d WHERE d.user_id = ?", (user_id,)))
+
+
+@_timed
+def doctors_by_ids(conn, ids):
+    """Return {id: Doctor} for many ids with one query"""
+    rows = Doctor.from_cursor(conn.execute(
+        f"SELECT {DOCTOR_COLUMNS} FROM doctors d WHERE d.id IN (SELECT value FROM json_each(?))", (_ids(ids),)))
+    return {row.id: row for row in rows}
+
+
+@_timed
+def doctor_patient_count(conn, doctor_id):
+    """Number of distinct patients the doctor has appointments with, archive included"""
+    return conn.execute("SELECT COUNT(DISTINCT patient_id) FROM (" + archive.union_archive("""
+        SELECT a.patient_id FROM {appointments} a WHERE a.doctor_id = ?
+    """) + ")", (doctor_id,) * 2).fetchone()[0]
+
+
+# Patients
+
+@_timed
+def patient_by_user(conn, user_id):
+    return _one(Patient, conn.execute(f"SELECT {PATIENT_COLUMNS} FROM patients p WHERE p.user_id = ?", (user_id,)))
+
+
+@_timed
+def patients_by_ids(conn, ids):
+    """Return {id: Patient} for many ids with one query"""
+    rows = Patient.from_cursor(conn.execute(
+        f"SELECT {PATIENT_COLUMNS} FROM patients p WHERE p.id IN (SELECT value FROM json_each(?))", (_ids(ids),)))
+    return {row.id: row for row in rows}
+
+
+# Appointments
+
+@_timed
+def appointment_with_patient(conn, appointment_id):
+    """One appointment with the patient details shown when completing it"""
+    return _one(Appointment, conn.execute(f"""
+        SELECT {APPOINTMENT_COLUMNS}, p.name AS patient_name, p.age, p.gender, p.blood_group, p.phone
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        WHERE a.id = ?
+    """, (appointment_id,)))
+
+
+@_timed
+def recent_appointments(conn, limit=10):
+    """Most recently created appointments; walks idx_appointments_created backwards"""
+    return Appointment.from_cursor(conn.execute(f"""
+        SELECT {APPOINTMENT_COLUMNS}, p.name AS patient_name, d.name AS doctor_name, d.specialization
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        JOIN doctors d ON a.doctor_id = d.id
+        ORDER BY a.created_at DESC, a.id DESC LIMIT ?
+    """, (limit,)))
+
+
+@_timed
+def doctor_upcoming(conn, doctor_id, today):
+    """The doctor's booked appointments from today on, with patient details"""
+    return Appointment.from_cursor(conn.execute(f"""
+        SELECT {APPOINTMENT_COLUMNS}, p.name AS patient_name, p.phone, p.age, p.gender
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        WHERE a.doctor_id = ? AND a.date >= ? AND a.status = 'Booked'
+        ORDER BY a.date, a.time
+    """, (doctor_id, today)))
+
+
+@_timed
+def patient_upcoming(conn, patient_id, today):
+    """The patient's appointments from today on, with doctor details"""
+    return Appointment.from_cursor(conn.execute(f"""
+        SELECT {APPOINTMENT_COLUMNS}, d.name AS doctor_name, d.specialization
+        FROM appointments a
+        JOIN doctors d ON a.doctor_id = d.id
+        WHERE a.patient_id = ? AND a.date >= ?
+        ORDER BY a.date, a.time
+    """, (patient_id, today)))
+
+
+@_timed
+def patient_past(conn, patient_id, today):
+    """The patient's past and completed appointments with treatments, archive included"""
+    return Appointment.from_cursor(conn.execute(archive.union_archive(f"""
+        SELECT {APPOINTMENT_COLUMNS}, d.name AS doctor_name, d.specialization, t.diagnosis, t.prescription
+        FROM {{appointments}} a
+        JOIN doctors d ON a.doctor_id = d.id
+        LEFT JOIN {{db}}.treatments t ON a.id = t.appointment_id
+        WHERE a.patient_id = ? AND (a.date < ? OR a.status = 'Completed')
+    """) + " ORDER BY date DESC, time DESC", (patient_id, today) * 2))
+
+
+@_timed
+def patient_history(conn, patient_id):
+    """The patient's completed appointments with treatments, archive included"""
+    return Appointment.from_cursor(conn.execute(archive.union_archive("""
+        SELECT a.id, a.date, a.time, t.diagnosis, t.prescription, t.notes
+        FROM {appointments} a
+        LEFT JOIN {db}.treatments t ON a.id = t.appointment_id
+        WHERE a.patient_id = ? AND a.status = 'Completed'
+    """) + " ORDER BY date DESC, time DESC", (patient_id,) * 2))
+
+
+# Availability
+
+@_timed
+def availability_between(conn, doctor_id, date_from, date_to):
+    """The doctor's one-off availability windows between two dates inclusive"""
+    return Availability.from_cursor(conn.execute(f"""
+        SELECT {AVAILABILITY_COLUMNS}
+        FROM doctor_availability v
+        WHERE v.doctor_id = ? AND v.date >= ? AND v.date <= ?
+        ORDER BY v.date, v.start_time
+    """, (doctor_id, date_from, date_to)))
+
+
+@_timed
+def current_rules(conn, doctor_id, today):
+    """The doctor's recurring availability rules that have not ended before today"""
+    return conn.execute("""
+        SELECT r.id, r.weekdays, r.start_time, r.end_time, r.valid_from, r.valid_until
+        FROM availability_rules r
+        WHERE r.doctor_id = ? AND (r.valid_until IS NULL OR r.valid_until >= ?)
+        ORDER BY r.valid_from, r.start_time
+    """, (doctor_id, today)).fetchall()
+
+
+@_timed
+def upcoming_exceptions(conn, doctor_id, today):
+    """The doctor's days off from today on"""
+    return conn.execute("""
+        SELECT e.id, e.date, e.reason FROM availability_exceptions e
+        WHERE e.doctor_id = ? AND e.date >= ?
+        ORDER BY e.date
+    """, (doctor_id, today)).fetchall()
@@ -0,0 +1,50 @@
+"""
+Patient search backed by the patients_fts full-text index.
+"""
+
+import re
+
+from repository import PATIENT_COLUMNS
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term and all terms must match, so
+    "jo 555" finds "John" with a phone number starting 555.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    return ' AND '.join(f'"{token}"*' for token in tokens)
+
+
+def has_fts(conn):
+    """Return True if the patients_fts index exists in this database"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patients_fts'").fetchone()
+    return row is not None
+
+
+def search_patients(conn, text, limit=100):
+    """Return up to limit active patients matching text, best matches first"""
+    if has_fts(conn):
+        query = fts_query(text)
+        if not query:
+            return []
+        return conn.execute(f"""
+            SELECT {PATIENT_COLUMNS}
+            FROM patients_fts f
+            JOIN patients p ON p.id = f.rowid
+            WHERE patients_fts MATCH ? AND p.is_active = 1
+            ORDER BY f.rank, p.name
+            LIMIT ?
+        """, (query, limit)).fetchall()
+    
+    pattern = f'%{text}%'
+    return conn.execute(f"""
+        SELECT {PATIENT_COLUMNS} FROM patients p
+        WHERE p.is_active = 1 AND (p.name LIKE ? OR p.phone LIKE ? OR p.email LIKE ?)
+        ORDER BY p.name
+        LIMIT ?
+    """, (pattern, pattern, pattern, limit)).fetchall()
@@ -0,0 +1,124 @@
+"""
+Free-slot computation over doctor availability.
+Availability windows are expanded into fixed-length slots and booked appointments
+are subtracted with a sorted merge, using a single range query per doctor (or per
+batch of doctors for next_free_slots).
+"""
+
+import json
+from datetime import datetime
+
+
+def to_minutes(value):
+    """Convert 'HH:MM' (or 'HH:MM:SS') to minutes after midnight"""
+    hours, minutes = value.split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def to_time(minutes):
+    """Convert minutes after midnight to 'HH:MM'"""
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def merge_windows(windows):
+    """Merge overlapping or touching (start, end) minute intervals"""
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def subtract_booked(windows, booked, slot_minutes, not_before=0):
+    """
+    Yield free slot start minutes for one day.
+
+    windows -- (start, end) availability intervals in minutes
+    booked  -- sorted start minutes of active appointments, each slot_minutes long
+    """
+    j = 0
+    for start, end in merge_windows(windows):
+        slot = start
+        while slot + slot_minutes <= end:
+            while j < len(booked) and booked[j] + slot_minutes <= slot:
+                j += 1
+            overlaps = j < len(booked) and booked[j] < slot + slot_minutes
+            if not overlaps and slot >= not_before:
+                yield slot
+            slot += slot_minutes
+
+
+def _group(rows):
+    """Split (date, start, end, booked) rows into per-date window and booked-start lists"""
+    windows, booked = {}, {}
+    for date, start, end, is_booked in rows:
+        if is_booked:
+            booked.setdefault(date, []).append(to_minutes(start))
+        else:
+            windows.setdefault(date, []).append((to_minutes(start), to_minutes(end)))
+    return windows, booked
+
+
+def _iter_free(windows, booked, slot_minutes, now):
+    """Yield free slot dicts in date and time order, skipping the past"""
+    today = now.strftime('%Y-%m-%d')
+    for day in sorted(windows):
+        if day < today:
+            continue
+        not_before = now.hour * 60 + now.minute if day == today else 0
+        for start in subtract_booked(windows[day], sorted(booked.get(day, [])), slot_minutes, not_before):
+            yield {'date': day, 'start': to_time(start), 'end': to_time(start + slot_minutes)}
+
+
+def free_slots(conn, doctor_id, date_from, date_to, slot_minutes=30, now=None, recurring=None):
+    """
+    Return free slots as dicts with date, start and end between date_from and date_to inclusive.
+
+    recurring, if given, is an availability.RecurringAvailability whose expanded
+    windows are merged with the one-off doctor_availability rows.
+    """
+    now = now or datetime.now()
+    rows = conn.execute("""
+        SELECT date, start_time, end_time, 0 AS booked FROM doctor_availability
+        WHERE doctor_id = ? AND date >= ? AND date <= ? AND is_available = 1
+        UNION ALL
+        SELECT date, time, NULL, 1 FROM appointments
+        WHERE doctor_id = ? AND date >= ? AND date <= ? AND status != 'Cancelled'
+        ORDER BY 1, 2
+    """, (doctor_id, date_from, date_to, doctor_id, date_from, date_to)).fetchall()
+
+    windows, booked = _group(rows)
+    if recurring is not None:
+        for date, start, end in recurring.windows(conn, doctor_id, date_from, date_to):
+            windows.setdefault(date, []).append((to_minutes(start), to_minutes(end)))
+    return list(_iter_free(windows, booked, slot_minutes, now))
+
+
+def next_free_slots(conn, doctor_ids, date_from, date_to, slot_minutes=30, now=None, recurring=None):
+    """
+    Return {doctor_id: first free slot dict, or None} for many doctors at once,
+    using one range query over all of them instead of one per doctor.
+    """
+    now = now or datetime.now()
+    doctor_ids = list(doctor_ids)
+    ids = json.dumps(doctor_ids)
+    rows = {doctor_id: [] for doctor_id in doctor_ids}
+    for row in conn.execute("""
+        SELECT doctor_id, date, start_time, end_time, 0 AS booked FROM doctor_availability
+        WHERE doctor_id IN (SELECT value FROM json_each(?)) AND date >= ? AND date <= ? AND is_available = 1
+        UNION ALL
+        SELECT doctor_id, date, time, NULL, 1 FROM appointments
+        WHERE doctor_id IN (SELECT value FROM json_each(?)) AND date >= ? AND date <= ? AND status != 'Cancelled'
+    """, (ids, date_from, date_to, ids, date_from, date_to)).fetchall():
+        rows[row[0]].append(tuple(row[1:]))
+    extra = recurring.windows_many(conn, doctor_ids, date_from, date_to) if recurring is not None else {}
+
+    result = {}
+    for doctor_id in doctor_ids:
+        windows, booked = _group(rows[doctor_id])
+        for date, start, end in extra.get(doctor_id, ()):
+            windows.setdefault(date, []).append((to_minutes(start), to_minutes(end)))
+        result[doctor_id] = next(_iter_free(windows, booked, slot_minutes, now), None)
+    return result
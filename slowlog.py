@@ -0,0 +1,105 @@
+"""
+Slow-query log.
+Queries whose execute plus fetch time reaches the configured threshold are written
+to a rotating JSONL file together with their parameter shape and EXPLAIN QUERY
+PLAN output; plan steps that scan a whole table are flagged.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def params_shape(params, many=None):
+    """
+    Describe parameters by type only, so values (e.g. patient data) never reach the log;
+    an executemany() batch is described as 'many x N'
+    """
+    if many is not None:
+        return f'many x {many}'
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(value).__name__ for value in params]
+    return 'many'
+
+
+def full_scans(plan):
+    """Return the plan steps that scan a table without using any index"""
+    return [step for step in plan
+            if step.startswith('SCAN ') and ' USING ' not in step and ' VIRTUAL TABLE ' not in step]
+
+
+class SlowQueryLog:
+    """Writes queries slower than threshold_ms to a rotating JSONL file"""
+
+    def __init__(self, path, threshold_ms=100, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.configure(path, threshold_ms, max_bytes, backup_count)
+
+    def configure(self, path, threshold_ms=100, max_bytes=5 * 1024 * 1024, backup_count=3):
+        """(Re)point the log at path with the given threshold and rotation limits"""
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self._logger = logging.getLogger(f'hms.slowlog.{os.path.abspath(path)}')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(path, delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+        for handler in self._logger.handlers:
+            handler.maxBytes = max_bytes
+            handler.backupCount = backup_count
+
+    def observe(self, conn, sql, params, elapsed, many=None):
+        """
+        InstrumentedConnection observer, called once a query's rows have been read: log
+        the query if elapsed (execute plus fetch time) was slow. For executemany()
+        params is the first parameter row (the one EXPLAIN runs with) and many the row count.
+        """
+        duration_ms = elapsed * 1000.0
+        if duration_ms < self.threshold_ms:
+            return
+        statement = _WHITESPACE_RE.sub(' ', sql).strip()
+        plan = []
+        if statement.upper().startswith(_EXPLAINABLE) and isinstance(params, (list, tuple, dict)):
+            try:
+                plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()]
+            except Exception as e:
+                plan = [f'EXPLAIN failed: {e}']
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'duration_ms': round(duration_ms, 3),
+            'sql': statement,
+            'params': params_shape(params, many),
+            'plan': plan,
+            'full_scans': full_scans(plan),
+        }
+        self._logger.info(json.dumps(entry))
+
+    def read(self, limit=200):
+        """Return up to limit most recent entries, newest first, across rotated files"""
+        entries = []
+        paths = [self.path] + [f'{self.path}.{i}' for i in range(1, 100)]
+        for path in paths:
+            if not os.path.exists(path):
+                break
+            with open(path, encoding='utf-8') as f:
+                lines = f.readlines()
+            for line in reversed(lines):
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(entries) >= limit:
+                    return entries
+        return entries
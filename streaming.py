@@ -0,0 +1,81 @@
+"""
+Streaming JSON responses for the API endpoints.
+Rows are read from the cursor in fetchmany() batches and serialized as they go,
+so the full result set is never materialized in memory.
+"""
+
+import json
+
+from flask import Response, stream_with_context
+
+import db
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def stream_format(request):
+    """
+    Return the streaming format requested by the client, or None for a regular response.
+
+    ?stream=1 / ?stream=ndjson or an Accept: application/x-ndjson header select NDJSON;
+    ?stream=json selects a chunked JSON array with the same shape as the plain list.
+    """
+    stream = request.args.get('stream', '').lower()
+    if stream == 'json':
+        return 'json'
+    if stream in ('1', 'true', 'ndjson'):
+        return 'ndjson'
+    if any(mimetype == NDJSON_MIMETYPE for mimetype, _ in request.accept_mimetypes):
+        return 'ndjson'
+    return None
+
+
+def _dumps(row):
+    return json.dumps(dict(row), separators=(',', ':'), default=str)
+
+
+def _generate(pool, sql, params, fmt, batch_size):
+    # The request's own connection goes back to the pool when the view returns,
+    # so the generator borrows a dedicated one for as long as it is iterating.
+    with db.connection(pool) as conn:
+        cursor = conn.execute(sql, params)
+        first = True
+        if fmt == 'json':
+            yield '['
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if fmt == 'json':
+                chunk = ','.join(_dumps(row) for row in rows)
+                yield chunk if first else ',' + chunk
+            else:
+                yield ''.join(_dumps(row) + '\n' for row in rows)
+            first = False
+        cursor.close()
+        if fmt == 'json':
+            yield ']'
+
+
+def stream_query(sql, params, fmt, batch_size=500):
+    """Return a streaming Response that serializes the query's rows batch by batch"""
+    mimetype = 'application/json' if fmt == 'json' else NDJSON_MIMETYPE
+    generator = _generate(db.get_pool(), sql, params, fmt, batch_size)
+    return Response(stream_with_context(generator), mimetype=mimetype)
+
+
+def stream_items(items, fmt, batch_size=500):
+    """Return a streaming Response for rows that are already in memory"""
+    def generate():
+        if fmt == 'json':
+            yield '['
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            if fmt == 'json':
+                yield (',' if start else '') + ','.join(_dumps(item) for item in batch)
+            else:
+                yield ''.join(_dumps(item) + '\n' for item in batch)
+        if fmt == 'json':
+            yield ']'
+    mimetype = 'application/json' if fmt == 'json' else NDJSON_MIMETYPE
+    return Response(generate(), mimetype=mimetype)